@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Drive the server past its capacity and measure goodput with and without
+admission control.
+
+Requests arrive open-loop at a fixed rate (default about twice what the echo
+backend can serve) and each asks for timeout_ms. Goodput counts the 200
+responses that came back within that deadline; shed requests (429/503) come
+back at once, timed-out ones only after the deadline.
+
+  off  ADMISSION_CONTROL=false: everything is queued and eventually times out
+  on   requests whose predicted queue wait exceeds their deadline are shed
+
+Each run also reports the model rows dropped before inference because their
+deadline had passed, and the rows inferred after their caller had given up.
+
+The script exits 1 unless admission control holds up:
+  - goodput with it on beats goodput with it off by --min-goodput-gain
+  - with it on, the server never answers 200 after the request's deadline
+    (its reported latency_ms stays within timeout_ms). Time spent before the
+    handler runs, in the accept backlog or in this client when it shares the
+    server's cores, is outside the deadline the server knows about; 200s that
+    arrive late for that reason are counted in the "late" column but do not
+    fail the run
+  - shed requests never reach the backend: the server's rejected counter
+    matches the 429/503 responses, and the rows it ran through the model do
+    not exceed the requests it accepted
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+from collections import Counter
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_server import LocalServer  # noqa: E402
+
+MODES = {
+    "off": {"ADMISSION_CONTROL": "false"},
+    "on": {"ADMISSION_CONTROL": "true"},
+}
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(url, duration, rate, timeout_ms):
+    """
+    Open-loop load; returns (status counts, latencies in ms of 200s within the
+    deadline, latencies in ms of 200s after it, server-side latencies in ms
+    of all 200s)
+    """
+    statuses = Counter()
+    good_ms = []
+    late_ms = []
+    server_ms = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def request(i):
+            start = time.perf_counter()
+            payload = {"input_text": f"admission benchmark {i}", "timeout_ms": timeout_ms}
+            try:
+                async with session.post(f"{url}/infer", json=payload) as response:
+                    body = await response.read()
+                    status = response.status
+            except aiohttp.ClientError:
+                status = "client_error"
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            statuses[status] += 1
+            if status == 200:
+                good_ms.append(elapsed_ms) if elapsed_ms <= timeout_ms else late_ms.append(elapsed_ms)
+                server_ms.append(json.loads(body)["latency_ms"])
+
+        tasks = []
+        start = time.perf_counter()
+        for i in range(int(duration * rate)):
+            # Arrivals follow the schedule regardless of how the server keeps up
+            delay = start + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(request(i)))
+        await asyncio.gather(*tasks)
+    return statuses, good_ms, late_ms, server_ms
+
+
+def scrape(url, names):
+    """Sum the samples of the given metric families from /metrics"""
+    totals = dict.fromkeys(names, 0.0)
+    with urllib.request.urlopen(f"{url}/metrics") as response:
+        for line in response.read().decode().splitlines():
+            name = line.split("{")[0].split(" ")[0]
+            if name in totals:
+                totals[name] += float(line.rsplit(" ", 1)[1])
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark goodput under overload with admission control")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of arrivals per mode")
+    parser.add_argument("--rate", type=float, default=800.0, help="Arrivals per second")
+    parser.add_argument("--timeout-ms", type=float, default=1000.0, help="Per-request deadline")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    parser.add_argument("--min-goodput-gain", type=float, default=0.5,
+                        help="Required relative goodput gain of on over off")
+    args = parser.parse_args()
+
+    goodput = {}
+    failures = []
+    for mode in args.modes:
+        env = {
+            # 4 batch workers x 10 ms per row: about 400 rows/s of capacity
+            "ECHO_LATENCY_PER_ITEM": "0.01",
+            "RESPONSE_CACHE_SIZE": "0",
+            "INFERENCE_LOGGING": "false",
+            **MODES[mode],
+        }
+        with LocalServer(env) as server:
+            statuses, good_ms, late_ms, server_ms = asyncio.run(drive(server.url, args.duration, args.rate, args.timeout_ms))
+            totals = scrape(server.url, ["inference_requests_dropped_total", "inference_wasted_rows_total",
+                                         "inference_requests_total", "inference_requests_rejected_total"])
+        goodput[mode] = len(good_ms) / args.duration
+        counts = "  ".join(f"{status}={count}" for status, count in sorted(statuses.items(), key=str))
+        print(f"{mode:>4}: goodput {len(good_ms) / args.duration:>7.1f} req/s   "
+              f"good p99 {percentile(good_ms, 0.99):>7.1f} ms   {counts}   late {len(late_ms)}   "
+              f"dropped {totals['inference_requests_dropped_total']:.0f}   "
+              f"wasted {totals['inference_wasted_rows_total']:.0f}")
+
+        if mode == "on":
+            late = [ms for ms in server_ms if ms > args.timeout_ms]
+            if late:
+                failures.append(f"on: server answered 200 after the deadline {len(late)} times (max {max(late):.0f} ms)")
+            shed = statuses[429] + statuses[503]
+            rejected = totals["inference_requests_rejected_total"]
+            if rejected != shed:
+                failures.append(f"on: server rejected {rejected:.0f} requests but {shed} came back 429/503")
+            accepted = sum(statuses.values()) - shed
+            inferred = totals["inference_requests_total"]
+            if inferred > accepted:
+                failures.append(f"on: {inferred:.0f} rows reached the backend for {accepted} accepted requests")
+
+    if "on" in goodput and "off" in goodput and goodput["on"] < goodput["off"] * (1 + args.min_goodput_gain):
+        failures.append(f"goodput on {goodput['on']:.1f} req/s is not {args.min_goodput_gain:.0%} above "
+                        f"off {goodput['off']:.1f} req/s")
+
+    if failures:
+        print("\nFAILED:")
+        for message in failures:
+            print(f"  {message}")
+        sys.exit(1)
+    print("\nAdmission control checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark dequeue cost of the server batch queue as queue depth grows.
+
+Compares the old list.pop(0) drain against BatchQueue. The per-item cost of
+BatchQueue should stay flat while list.pop(0) grows with queue depth.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+from batching import BatchEntry, BatchQueue  # noqa: E402
+
+DEPTHS = [1_000, 10_000, 50_000, 100_000]
+BATCH_SIZE = 32
+
+
+def bench_list(depth):
+    """Drain a list-based queue the way the old batch_worker did"""
+    queue = [{"payload": i, "future": None} for i in range(depth)]
+    start = time.perf_counter()
+    while queue:
+        items = []
+        while queue and len(items) < BATCH_SIZE:
+            items.append(queue.pop(0))
+    return time.perf_counter() - start
+
+
+async def bench_batch_queue(depth):
+    """Drain a BatchQueue in BATCH_SIZE chunks"""
+    loop = asyncio.get_running_loop()
+    queue = BatchQueue()
+    for i in range(depth):
+        queue.put(BatchEntry(i, loop.create_future()))
+    start = time.perf_counter()
+    while len(queue):
+        queue.get_nowait(BATCH_SIZE)
+    return time.perf_counter() - start
+
+
+async def bench_consumers(depth, workers):
+    """Producer/consumer round trip with several workers waiting on the queue"""
+    queue = BatchQueue()
+    drained = 0
+    done = asyncio.Event()
+
+    async def worker():
+        nonlocal drained
+        while True:
+            await queue.wait_not_empty()
+            drained += len(queue.get_nowait(BATCH_SIZE))
+            if drained >= depth:
+                done.set()
+            await asyncio.sleep(0)
+
+    loop = asyncio.get_running_loop()
+    tasks = [asyncio.create_task(worker()) for _ in range(workers)]
+    start = time.perf_counter()
+    for i in range(depth):
+        queue.put(BatchEntry(i, loop.create_future()))
+        if i % BATCH_SIZE == 0:
+            await asyncio.sleep(0)
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch queue dequeue cost")
+    parser.add_argument("--depths", type=int, nargs="+", default=DEPTHS,
+                        help="Queue depths to measure")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Concurrent consumers for the round-trip benchmark")
+    args = parser.parse_args()
+
+    print(f"{'depth':>10} {'list.pop(0) ns/item':>20} {'BatchQueue ns/item':>20} {'round trip ns/item':>20}")
+    print("-" * 74)
+    for depth in args.depths:
+        list_time = bench_list(depth)
+        queue_time = await bench_batch_queue(depth)
+        round_trip = await bench_consumers(depth, args.workers)
+        print(f"{depth:>10} {list_time / depth * 1e9:>20.1f} "
+              f"{queue_time / depth * 1e9:>20.1f} {round_trip / depth * 1e9:>20.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
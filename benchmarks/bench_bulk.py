@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare rows per second for a bulk job sent as one POST per input to /infer
+versus chunks of inputs sent to /infer_batch (JSON and streamed NDJSON).
+
+The echo backend runs with no simulated compute by default, so the numbers
+show how much of the server's time goes to per-request HTTP and parsing
+work rather than to the model.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_server import LocalServer  # noqa: E402
+
+
+async def per_item(url, inputs, concurrency):
+    """One /infer POST per input from concurrency clients"""
+    position = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def client():
+            nonlocal position
+            while position < len(inputs):
+                text = inputs[position]
+                position += 1
+                async with session.post(f"{url}/infer", json={"input_text": text}) as response:
+                    await response.read()
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+
+async def bulk(url, inputs, chunk_size, concurrency, ndjson):
+    """Chunks of chunk_size inputs per /infer_batch POST, concurrency chunks in flight"""
+    chunks = [inputs[i:i + chunk_size] for i in range(0, len(inputs), chunk_size)]
+    position = 0
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def client():
+            nonlocal position
+            while position < len(chunks):
+                chunk = chunks[position]
+                position += 1
+                if ndjson:
+                    body = "\n".join(json.dumps(text) for text in chunk)
+                    headers = {"Content-Type": "application/x-ndjson", "Accept": "application/x-ndjson"}
+                    async with session.post(f"{url}/infer_batch", data=body, headers=headers) as response:
+                        async for _ in response.content:
+                            pass
+                else:
+                    async with session.post(f"{url}/infer_batch", json={"inputs": chunk}) as response:
+                        await response.read()
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+
+
+def timed(coroutine):
+    start = time.perf_counter()
+    asyncio.run(coroutine)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /infer_batch against per-input /infer")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent /infer clients")
+    parser.add_argument("--bulk-concurrency", type=int, default=4, help="Concurrent /infer_batch requests")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--echo-latency", type=float, default=0.0, help="ECHO_LATENCY_PER_ITEM")
+    args = parser.parse_args()
+
+    inputs = [f"bulk benchmark row {i}" for i in range(args.rows)]
+    env = {
+        "ECHO_LATENCY_PER_ITEM": args.echo_latency,
+        "RESPONSE_CACHE_SIZE": "0",
+        "INFERENCE_LOGGING": "false",
+    }
+    with LocalServer(env) as server:
+        timed(per_item(server.url, inputs[:1000], args.concurrency))  # warm-up
+        elapsed = timed(per_item(server.url, inputs, args.concurrency))
+        print(f"{'/infer per input':>28}: {args.rows / elapsed:>9.1f} rows/s")
+        for chunk_size in args.chunk_sizes:
+            for ndjson in (False, True):
+                elapsed = timed(bulk(server.url, inputs, chunk_size, args.bulk_concurrency, ndjson))
+                label = f"/infer_batch x{chunk_size} {'ndjson' if ndjson else 'json'}"
+                print(f"{label:>28}: {args.rows / elapsed:>9.1f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
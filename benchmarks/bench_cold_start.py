@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Measure cold start of the sentiment service (models/app.py): seconds from
+process launch until /health/live and /health/ready answer 200, plus the
+per-phase load timings the service reports.
+
+  hub    MODEL_DIR unset: weights are downloaded (or read from the HF cache)
+  local  MODEL_DIR=--model-dir, a model saved with `python model_loader.py DIR`
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_sentiment_service import MODELS_DIR  # noqa: E402
+from local_server import free_port  # noqa: E402
+
+
+def poll(url, deadline):
+    """Seconds until url answers 200, with its JSON body"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                return time.perf_counter(), json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} not ready in time")
+
+
+def cold_start(env, timeout):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "app.py"], cwd=MODELS_DIR,
+                               env={**os.environ, **env, "PORT": str(port)},
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        live_at, _ = poll(f"{url}/health/live", start + timeout)
+        ready_at, status = poll(f"{url}/health/ready", start + timeout)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return live_at - start, ready_at - start, status["load_seconds"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sentiment service startup")
+    parser.add_argument("--model-dir", help="Saved model for the local mode")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    modes = {"hub": {"MODEL_DIR": ""}}
+    if args.model_dir:
+        modes["local"] = {"MODEL_DIR": os.path.abspath(args.model_dir), "HF_HUB_OFFLINE": "1"}
+    for mode, env in modes.items():
+        for run in range(args.runs):
+            live, ready, phases = cold_start(env, args.timeout)
+            detail = "  ".join(f"{phase} {seconds:.2f}s" for phase, seconds in phases.items())
+            print(f"{mode:>5} #{run + 1}: live {live:>6.2f}s   ready {ready:>6.2f}s   ({detail})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Compare static and continuous batching on a generation workload.
+
+Both modes start server/app.py with the mock-generate backend, whose output
+length varies per prompt (1 to MOCK_MAX_NEW_TOKENS tokens), and drive /infer
+with a fixed number of concurrent clients. Latency is reported separately for
+short and long generations: with static batching short requests wait for the
+longest sequence in their batch, with continuous batching they leave as soon
+as they finish.
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_server import LocalServer  # noqa: E402
+
+MODES = ["static", "continuous"]
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(url, duration, concurrency):
+    """Closed-loop load; returns (requests/s, tokens/s, [(output_tokens, latency_ms)])"""
+    samples = []
+    stop_at = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def client(client_id):
+            i = 0
+            while time.perf_counter() < stop_at:
+                payload = {"input_text": f"continuous batching benchmark {client_id}-{i}"}
+                start = time.perf_counter()
+                async with session.post(f"{url}/infer", json=payload) as response:
+                    body = await response.json()
+                if response.status == 200:
+                    samples.append((len(body["result"].split()), (time.perf_counter() - start) * 1000))
+                i += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(c) for c in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(samples) / elapsed, sum(tokens for tokens, _ in samples) / elapsed, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark static vs continuous batching")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--kv-budget", type=int, default=65536, help="KV_CACHE_BUDGET_TOKENS")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    args = parser.parse_args()
+
+    short_cutoff = args.max_new_tokens // 4
+    print(f"short = at most {short_cutoff} output tokens, long = more than {3 * short_cutoff}")
+    for mode in args.modes:
+        env = {
+            "MODEL_BACKEND": "mock-generate",
+            "SCHEDULER_MODE": mode,
+            "BATCH_SIZE": args.batch_size,
+            "MOCK_MAX_NEW_TOKENS": args.max_new_tokens,
+            "KV_CACHE_BUDGET_TOKENS": args.kv_budget,
+            "RESPONSE_CACHE_SIZE": "0",
+            "INFERENCE_LOGGING": "false",
+        }
+        with LocalServer(env) as server:
+            asyncio.run(drive(server.url, 1.0, args.concurrency))  # warm-up
+            rps, tps, samples = asyncio.run(drive(server.url, args.duration, args.concurrency))
+        short = [ms for tokens, ms in samples if tokens <= short_cutoff]
+        long = [ms for tokens, ms in samples if tokens > 3 * short_cutoff]
+        print(f"{mode:>10}: {rps:>7.1f} req/s {tps:>9.1f} tok/s   "
+              f"short p50 {percentile(short, 0.5):>7.1f} ms p99 {percentile(short, 0.99):>7.1f} ms   "
+              f"long p50 {percentile(long, 0.5):>7.1f} ms   "
+              f"mean {statistics.fmean(ms for _, ms in samples):>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark /infer requests per second with inference logging on versus off.
+
+Each mode starts server/app.py with a logging config that writes to a file
+(the same I/O path monitoring/logging-config.yaml sets up) and drives it
+with a fixed number of concurrent clients sharing one aiohttp session:
+
+  off             per-inference/per-batch events disabled
+  sync-per-event  every event logged synchronously on the event loop (old behaviour)
+  async-summary   queue-backed handlers with aggregated summary records (default)
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_server import LocalServer  # noqa: E402
+
+MODES = {
+    "off": {"INFERENCE_LOGGING": "false"},
+    "sync-per-event": {"ASYNC_LOGGING": "false", "INFERENCE_LOG_SAMPLE_RATE": "1.0"},
+    "async-summary": {},
+}
+
+LOGGING_CONFIG = """
+logging:
+  level: INFO
+  formatters:
+    plain:
+      format: "%(asctime)s %(name)s %(levelname)s %(message)s"
+  handlers:
+    file:
+      class: logging.FileHandler
+      level: INFO
+      formatter: plain
+      filename: {log_file}
+  root:
+    level: INFO
+    handlers: [file]
+"""
+
+
+async def drive(url, duration, concurrency):
+    """Closed-loop load for duration seconds; returns completed requests per second"""
+    completed = 0
+    stop_at = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def client(client_id):
+            nonlocal completed
+            i = 0
+            while time.perf_counter() < stop_at:
+                payload = {"input_text": f"logging benchmark {client_id}-{i}"}
+                async with session.post(f"{url}/infer", json=payload) as response:
+                    await response.read()
+                    if response.status == 200:
+                        completed += 1
+                i += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(c) for c in range(concurrency)))
+        return completed / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging overhead on /infer")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes:
+            log_file = os.path.join(tmp, f"{mode}.log")
+            config_path = os.path.join(tmp, f"{mode}.yaml")
+            with open(config_path, "w") as f:
+                f.write(LOGGING_CONFIG.format(log_file=log_file))
+            env = {
+                "LOGGING_CONFIG_PATH": config_path,
+                "ECHO_LATENCY_PER_ITEM": "0",
+                "RESPONSE_CACHE_SIZE": "0",
+                **MODES[mode],
+            }
+            with LocalServer(env) as server:
+                asyncio.run(drive(server.url, 1.0, args.concurrency))  # warm-up
+                results[mode] = asyncio.run(drive(server.url, args.duration, args.concurrency))
+            size = os.path.getsize(log_file) if os.path.exists(log_file) else 0
+            print(f"{mode:>16}: {results[mode]:>9.1f} req/s   log file {size / 1024:.1f} KiB")
+
+    if "off" in results:
+        print()
+        for mode, rps in results.items():
+            if mode != "off":
+                print(f"{mode:>16}: {rps / results['off'] * 100:.1f}% of logging-off throughput")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Compare a fan-out of single-text predictions sent one request each with the
+same calls coalesced by models/micro_batcher.py.
+
+The local Vertex stub (stub_vertex.py) charges a fixed latency per request
+plus a small cost per instance, like a remote endpoint where the round trip
+dominates. The run reports the predict requests the stub received, the wall
+time for the whole fan-out and per-call latency.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models"))
+
+from micro_batcher import MicroBatcher  # noqa: E402
+from prediction_client import PredictionClient  # noqa: E402
+from stub_vertex import StubVertexServer  # noqa: E402
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def fan_out(predict, texts, concurrency):
+    """Run predict over texts with at most concurrency calls outstanding; returns latencies in ms"""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(text):
+        async with semaphore:
+            start = time.perf_counter()
+            await predict({"text": text})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(call(text) for text in texts))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark client-side micro-batching of predictions")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=256, help="Outstanding make_prediction calls")
+    parser.add_argument("--max-instances", type=int, default=32)
+    parser.add_argument("--max-wait", type=float, default=0.005)
+    parser.add_argument("--predict-latency", type=float, default=0.02, help="Stub seconds per request")
+    parser.add_argument("--per-instance-latency", type=float, default=0.0002, help="Stub seconds per instance")
+    args = parser.parse_args()
+
+    texts = [f"fan-out text {i}" for i in range(args.calls)]
+    with StubVertexServer(predict_latency=args.predict_latency,
+                          predict_latency_per_instance=args.per_instance_latency) as server:
+        client = PredictionClient("stub-project", "local", "bench", endpoint_factory=server.endpoint_factory)
+
+        async def single(instance):
+            return (await client.predict_async([instance])).predictions[0]
+
+        batcher = MicroBatcher(client, max_instances=args.max_instances, max_wait=args.max_wait)
+        for label, predict in (("single", single), ("batched", batcher.predict)):
+            requests_before = server.handler.predict_requests
+            start = time.perf_counter()
+            latencies = asyncio.run(fan_out(predict, texts, args.concurrency))
+            elapsed = time.perf_counter() - start
+            requests = server.handler.predict_requests - requests_before
+            print(f"{label:>8}: {requests:>6} requests   {args.calls / elapsed:>8.1f} predictions/s   "
+                  f"p50 {percentile(latencies, 0.5):>7.1f} ms   p99 {percentile(latencies, 0.99):>7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
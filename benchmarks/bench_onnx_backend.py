@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Check the ONNX Runtime backend of the sentiment model against PyTorch, then
+compare their latency and throughput at several batch sizes.
+
+Backends (all loaded through models/model_loader.py):
+
+  torch      the transformers pipeline in PyTorch eager mode
+  onnx-fp32  the exported model on ONNX Runtime
+  onnx-int8  the exported model with dynamic int8 quantization
+
+Parity runs every backend on the instances of --input (sample_request.json
+format) plus a few extra texts: labels must match torch, and scores must be
+within --fp32-tolerance / --int8-tolerance. The script exits 1 when they do
+not, so it can gate a switch to MODEL_BACKEND=onnx.
+
+Needs torch, transformers, onnx and onnxruntime; point --model-dir at a
+model saved with `python model_loader.py DIR --onnx` to skip the export.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models"))
+
+from model_loader import ModelLoader  # noqa: E402
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+BACKENDS = {
+    "torch": {"backend": "torch"},
+    "onnx-fp32": {"backend": "onnx", "quantize": False},
+    "onnx-int8": {"backend": "onnx", "quantize": True},
+}
+EXTRA_TEXTS = [
+    "The movie was a complete waste of time.",
+    "Absolutely wonderful experience, I would come back any day.",
+    "The package arrived late and the box was damaged.",
+    "Not bad at all, pleasantly surprised.",
+    "I can't say I enjoyed it, but the acting was fine.",
+]
+
+
+def load_texts(path):
+    with open(path, "r") as f:
+        return [instance["text"] for instance in json.load(f)["instances"]] + EXTRA_TEXTS
+
+
+def parity(reference, results, tolerance):
+    """(label mismatches, max absolute score difference) against the reference results"""
+    mismatches = sum(a["label"] != b["label"] for a, b in zip(reference, results))
+    max_diff = max(abs(a["score"] - b["score"]) for a, b in zip(reference, results))
+    return mismatches, max_diff, mismatches == 0 and max_diff <= tolerance
+
+
+def time_batches(loader, texts, batch_size, iterations):
+    """Median seconds per classify call on batch_size texts"""
+    batch = [texts[i % len(texts)] for i in range(batch_size)]
+    loader.classify(batch)  # warm-up for this shape
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        loader.classify(batch)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX Runtime backend parity and performance check")
+    parser.add_argument("--model-dir", default="", help="Saved model directory (MODEL_DIR)")
+    parser.add_argument("--input", default=os.path.join(MODELS_DIR, "sample_request.json"))
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads for every backend")
+    parser.add_argument("--fp32-tolerance", type=float, default=1e-3)
+    parser.add_argument("--int8-tolerance", type=float, default=0.05)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS))
+    args = parser.parse_args()
+
+    texts = load_texts(args.input)
+    loaders = {}
+    for name in ["torch"] + [b for b in args.backends if b != "torch"]:
+        loader = ModelLoader(model_dir=args.model_dir, batch_size=max(args.batch_sizes),
+                             num_threads=args.threads, num_interop_threads=1, **BACKENDS[name])
+        loader.load()
+        loaders[name] = loader
+        print(f"{name:>9}: loaded in {loader.timings['total']:.2f}s {loader.timings}")
+
+    print("\nParity against torch:")
+    reference = loaders["torch"].classify(texts)
+    passed = True
+    for name, loader in loaders.items():
+        if name == "torch":
+            continue
+        tolerance = args.int8_tolerance if name == "onnx-int8" else args.fp32_tolerance
+        mismatches, max_diff, ok = parity(reference, loader.classify(texts), tolerance)
+        passed = passed and ok
+        print(f"{name:>9}: {mismatches} label mismatches / {len(texts)}   max score diff {max_diff:.5f}   "
+              f"(tolerance {tolerance})   {'PASS' if ok else 'FAIL'}")
+
+    print("\nLatency per batch and throughput:")
+    for batch_size in args.batch_sizes:
+        for name in args.backends:
+            seconds = time_batches(loaders[name], texts, batch_size, args.iterations)
+            print(f"batch {batch_size:>3} {name:>9}: {seconds * 1000:>8.2f} ms   {batch_size / seconds:>8.1f} texts/s")
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
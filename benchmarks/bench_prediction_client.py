@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measure the per-call overhead that models/prediction_client.py removes.
+
+A local HTTP stub (stub_vertex.py) stands in for Vertex AI. StubEndpoint
+opens its own connection and looks the endpoint up when it is constructed,
+like a real Endpoint opening its channel.
+
+  per-call  aiplatform.init + Endpoint(...) on every prediction (old make_prediction)
+  shared    one PredictionClient, so one lookup and one kept-alive connection
+  async     the shared client's predict_async with --concurrency callers
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models"))
+
+from prediction_client import PredictionClient  # noqa: E402
+from stub_vertex import StubEndpoint, StubVertexServer  # noqa: E402
+
+
+def per_call(port, calls):
+    for i in range(calls):
+        endpoint = StubEndpoint(port, "bench")
+        endpoint.predict([{"text": f"per-call {i}"}])
+        endpoint.close()
+
+
+def shared(client, calls):
+    for i in range(calls):
+        client.predict([{"text": f"shared {i}"}])
+
+
+async def shared_async(client, calls, concurrency):
+    position = 0
+
+    async def caller():
+        nonlocal position
+        while position < calls:
+            position += 1
+            await client.predict_async([{"text": f"async {position}"}])
+
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+
+
+def report(label, calls, elapsed):
+    print(f"{label:>10}: {elapsed / calls * 1e6:>9.1f} us/call   {calls / elapsed:>9.1f} calls/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a shared prediction client against per-call setup")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8, help="Callers for the async run")
+    parser.add_argument("--lookup-latency", type=float, default=0.0, help="Seconds per endpoint metadata lookup")
+    parser.add_argument("--predict-latency", type=float, default=0.0, help="Seconds per prediction")
+    args = parser.parse_args()
+
+    with StubVertexServer(args.lookup_latency, args.predict_latency) as server:
+        start = time.perf_counter()
+        per_call(server.port, args.calls)
+        report("per-call", args.calls, time.perf_counter() - start)
+
+        client = PredictionClient("stub-project", "local", "bench", endpoint_factory=server.endpoint_factory)
+        start = time.perf_counter()
+        shared(client, args.calls)
+        report("shared", args.calls, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        asyncio.run(shared_async(client, args.calls, args.concurrency))
+        report("async", args.calls, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
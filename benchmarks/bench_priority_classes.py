@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Measure interactive /infer latency while a bulk backfill floods the server.
+
+Each mode starts server/app.py and runs two client groups at once on one
+aiohttp session: many backfill clients submitting back to back, and a few
+interactive clients sending one request every --interactive-interval seconds.
+
+  fifo      no priority tags, so everything shares one FIFO class (old behaviour)
+  weighted  requests tagged "interactive"/"backfill" with PRIORITY_CLASSES
+            weighted fair queuing and per-class batch size/timeout
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_server import LocalServer  # noqa: E402
+
+PRIORITY_CLASSES = "interactive:8:8:0.002,backfill:1:16:0.02"
+MODES = {
+    "fifo": {"PRIORITY_CLASSES": "default"},
+    "weighted": {"PRIORITY_CLASSES": PRIORITY_CLASSES},
+}
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(url, duration, tagged, backfill_clients, interactive_clients, interactive_interval):
+    """Returns (interactive latencies in ms, completed backfill requests per second)"""
+    interactive_ms = []
+    backfill_done = 0
+    stop_at = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=backfill_clients + interactive_clients)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def request(text, priority):
+            payload = {"input_text": text}
+            if tagged:
+                payload["priority"] = priority
+            async with session.post(f"{url}/infer", json=payload) as response:
+                await response.read()
+                return response.status
+
+        async def backfill(client_id):
+            nonlocal backfill_done
+            i = 0
+            while time.perf_counter() < stop_at:
+                if await request(f"backfill row {client_id}-{i}", "backfill") == 200:
+                    backfill_done += 1
+                i += 1
+
+        async def interactive(client_id):
+            i = 0
+            while time.perf_counter() < stop_at:
+                start = time.perf_counter()
+                if await request(f"interactive query {client_id}-{i}", "interactive") == 200:
+                    interactive_ms.append((time.perf_counter() - start) * 1000)
+                i += 1
+                await asyncio.sleep(interactive_interval)
+
+        start = time.perf_counter()
+        await asyncio.gather(*[backfill(c) for c in range(backfill_clients)],
+                             *[interactive(c) for c in range(interactive_clients)])
+        return interactive_ms, backfill_done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark interactive latency under a backfill flood")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per mode")
+    parser.add_argument("--backfill-clients", type=int, default=256)
+    parser.add_argument("--interactive-clients", type=int, default=8)
+    parser.add_argument("--interactive-interval", type=float, default=0.05)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        env = {
+            "ECHO_LATENCY_PER_ITEM": "0.005",
+            "RESPONSE_CACHE_SIZE": "0",
+            "INFERENCE_LOGGING": "false",
+            **MODES[mode],
+        }
+        with LocalServer(env) as server:
+            interactive_ms, backfill_rps = asyncio.run(drive(
+                server.url, args.duration, mode != "fifo", args.backfill_clients,
+                args.interactive_clients, args.interactive_interval))
+        print(f"{mode:>9}: interactive p50 {percentile(interactive_ms, 0.5):>7.1f} ms "
+              f"p99 {percentile(interactive_ms, 0.99):>7.1f} ms ({len(interactive_ms)} requests)   "
+              f"backfill {backfill_rps:>7.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
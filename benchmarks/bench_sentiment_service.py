@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Measure /predict throughput of the Flask sentiment service (models/app.py).
+
+Each mode starts the service in a subprocess and drives it with concurrent
+clients on one aiohttp session for a fixed duration:
+
+  per-request  BATCHING=false: every request runs the pipeline on its own text
+  batched      concurrent requests are coalesced into one pipeline call
+  list         batched, and each request sends --list-size texts as {"texts": [...]}
+
+Needs the service's dependencies (torch, transformers) and the model weights.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from local_server import free_port  # noqa: E402
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models")
+MODES = {
+    "per-request": {"BATCHING": "false"},
+    "batched": {"BATCHING": "true"},
+    "list": {"BATCHING": "true"},
+}
+TEXTS = [
+    "I love this product!",
+    "This is terrible.",
+    "It's okay, not great but not bad either.",
+    "The service was quick and the staff were friendly.",
+]
+
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class SentimentService:
+    """Context manager running models/app.py with the given environment"""
+
+    def __init__(self, env, startup_timeout=300):
+        self.port = free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.env = {**os.environ, **env, "PORT": str(self.port)}
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen([sys.executable, "app.py"], cwd=MODELS_DIR, env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"models/app.py exited with {self.process.returncode}")
+            try:
+                urllib.request.urlopen(f"{self.url}/health/ready", timeout=1).read()
+                return self
+            except OSError:
+                time.sleep(0.5)
+        raise RuntimeError("models/app.py did not become ready in time")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait(timeout=30)
+
+
+async def drive(url, duration, concurrency, list_size):
+    """Returns (texts classified per second, request latencies in ms)"""
+    latencies = []
+    texts_done = 0
+    stop_at = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def client(client_id):
+            nonlocal texts_done
+            i = 0
+            while time.perf_counter() < stop_at:
+                if list_size:
+                    payload = {"texts": [TEXTS[(i + j) % len(TEXTS)] for j in range(list_size)]}
+                else:
+                    payload = {"text": TEXTS[(client_id + i) % len(TEXTS)]}
+                start = time.perf_counter()
+                async with session.post(f"{url}/predict", json=payload) as response:
+                    await response.read()
+                    if response.status == 200:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                        texts_done += list_size or 1
+                i += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(c) for c in range(concurrency)))
+        return texts_done / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment service with and without batching")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per mode")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--list-size", type=int, default=16, help="Texts per request in list mode")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--torch-threads", type=int, default=0, help="TORCH_NUM_THREADS (0 = default)")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        env = {
+            "BATCH_SIZE": str(args.batch_size),
+            "TORCH_NUM_THREADS": str(args.torch_threads),
+            **MODES[mode],
+        }
+        with SentimentService(env) as service:
+            asyncio.run(drive(service.url, 2.0, args.concurrency, 0))  # warm-up
+            rate, latencies = asyncio.run(drive(service.url, args.duration, args.concurrency,
+                                                args.list_size if mode == "list" else 0))
+        print(f"{mode:>11}: {rate:>8.1f} texts/s   p50 {percentile(latencies, 0.5):>7.1f} ms   "
+              f"p99 {percentile(latencies, 0.99):>7.1f} ms ({len(latencies)} requests)")
+
+
+if __name__ == "__main__":
+    main()
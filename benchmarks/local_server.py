@@ -0,0 +1,75 @@
+"""
+Launch server/app.py under uvicorn in a subprocess for local benchmarks.
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """Context manager running the inference server with the given environment"""
+
+    def __init__(self, env=None, port=None, workers=1, startup_timeout=60, log_path=os.devnull):
+        self.env = {**os.environ, **{k: str(v) for k, v in (env or {}).items()}}
+        self.port = port or free_port()
+        self.workers = workers
+        self.startup_timeout = startup_timeout
+        self.log_path = log_path
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.process = None
+        self._log = None
+
+    def start(self):
+        command = [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--app-dir", SERVER_DIR,
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "--workers", str(self.workers),
+            "--log-level", "warning",
+            "--no-access-log",
+        ]
+        self._log = open(self.log_path, "a")
+        self.process = subprocess.Popen(command, env=self.env, stdout=self._log, stderr=subprocess.STDOUT)
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited during startup with code {self.process.returncode}")
+            try:
+                with urllib.request.urlopen(f"{self.url}/healthz", timeout=1) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Server did not become healthy within {self.startup_timeout}s")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
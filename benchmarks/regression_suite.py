@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Performance regression suite for the inference server
+
+Starts server/app.py as a subprocess with the deterministic echo backend
+(fixed sleep per row, no response cache, no admission control), runs a set
+of standard scenarios on a fresh server each, and compares the results to
+the baselines stored in baselines.json:
+
+  single         one client sending requests one after another
+  burst          every request sent at once
+  sustained      open-loop constant arrivals at a fixed rate
+  large_payload  open-loop arrivals with multi-kilobyte inputs
+
+Each scenario reports goodput (successful requests/second), p99 latency
+and the server's peak resident memory. A metric regresses when it is
+outside its tolerance band: throughput below baseline * (1 - tolerance),
+p99 or memory above baseline * (1 + tolerance) plus an absolute slack that
+absorbs timer noise on very small values. Throughput is only gated for the
+closed-loop and saturating scenarios (single, burst); open-loop scenarios
+serve their offered rate whenever the server keeps up, so their latency
+carries the signal. Bands can be set per scenario, and each scenario runs
+--repeat times (5 by default) on fresh servers, the median being compared
+and recorded. Failed requests count as a regression too. The script exits 1 on any regression, so a batcher change
+can be checked locally before rollout:
+
+    python benchmarks/regression_suite.py
+    python benchmarks/regression_suite.py --update-baselines   # after an intended change
+
+Baselines depend on the machine; record them on the machine that runs the
+check. Server settings other than the backend come from the environment
+and --env, so the same run can compare e.g. BATCH_SIZE values.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCHMARKS_DIR)
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, ".."))
+
+from latency_histogram import LatencyHistogram  # noqa: E402
+from local_server import LocalServer  # noqa: E402
+
+BASELINES_FILE = os.path.join(BENCHMARKS_DIR, "baselines.json")
+SERVER_ENV = {
+    "MODEL_BACKEND": "echo",
+    "ECHO_LATENCY_PER_ITEM": "0.002",
+    "RESPONSE_CACHE_SIZE": "0",
+    "ADMISSION_CONTROL": "false",
+    "INFERENCE_LOGGING": "false",
+}
+SCENARIOS = {
+    "single": {"kind": "sequential", "requests": 200, "input_bytes": 64},
+    "burst": {"kind": "burst", "requests": 500, "input_bytes": 64},
+    "sustained": {"kind": "open", "rate": 200, "duration": 10, "input_bytes": 64},
+    "large_payload": {"kind": "open", "rate": 50, "duration": 5, "input_bytes": 16384},
+}
+METRICS = ["throughput_rps", "p99_ms", "peak_rss_mb"]
+# Sized from the spread of repeat=5 medians on unchanged code (1 CPU): single
+# p99 21-25 ms at 64-66 req/s, burst p99 474-524 ms at 740-825 req/s,
+# large_payload p99 23-35 ms, sustained p99 33-68 ms
+DEFAULT_TOLERANCES = {
+    "throughput_rps": {"relative": 0.10},
+    "p99_ms": {"relative": 0.25, "absolute": 5.0},
+    "peak_rss_mb": {"relative": 0.20, "absolute": 5.0},
+}
+# A burst's throughput hinges on how the scheduler interleaves 500
+# connections; open-loop tails on a shared core swing with short stalls, the
+# sustained one by up to 2x between medians
+SCENARIO_TOLERANCES = {
+    "burst": {"throughput_rps": {"relative": 0.20}},
+    "sustained": {"p99_ms": {"relative": 0.75, "absolute": 10.0}},
+    "large_payload": {"p99_ms": {"relative": 0.25, "absolute": 10.0}},
+}
+
+
+def make_input(request_id, input_bytes):
+    """Distinct text of about input_bytes characters"""
+    prefix = f"regression request {request_id} "
+    return (prefix + "lorem ipsum " * (input_bytes // 12 + 1))[:max(input_bytes, len(prefix))]
+
+
+def peak_rss_mb(pid):
+    """Peak resident memory of process pid in MB (Linux /proc), None where unavailable"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def run_scenario(url, scenario):
+    """Drive one scenario; returns (successful, failed, elapsed seconds, latency histogram)"""
+    histogram = LatencyHistogram()
+    outcomes = {"ok": 0, "failed": 0}
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        async def request(request_id, intended=None):
+            start = time.perf_counter()
+            payload = {"input_text": make_input(request_id, scenario["input_bytes"])}
+            try:
+                async with session.post(f"{url}/infer", json=payload) as response:
+                    await response.read()
+                    ok = response.status == 200
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            histogram.record((time.perf_counter() - (intended or start)) * 1000)
+            outcomes["ok" if ok else "failed"] += 1
+
+        test_start = time.perf_counter()
+        if scenario["kind"] == "sequential":
+            for i in range(scenario["requests"]):
+                await request(i)
+        elif scenario["kind"] == "burst":
+            await asyncio.gather(*(request(i) for i in range(scenario["requests"])))
+        else:
+            # Open loop: latency counts from each request's scheduled time
+            tasks = []
+            for i in range(int(scenario["rate"] * scenario["duration"])):
+                intended = test_start + i / scenario["rate"]
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(request(i, intended)))
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - test_start
+    return outcomes["ok"], outcomes["failed"], elapsed, histogram
+
+
+def measure(scenario, env):
+    """Run scenario against a fresh server and return its metrics"""
+    with LocalServer(env) as server:
+        # Warm up connections and the batcher before measuring
+        asyncio.run(run_scenario(server.url, {"kind": "sequential", "requests": 20, "input_bytes": 64}))
+        successful, failed, elapsed, histogram = asyncio.run(run_scenario(server.url, scenario))
+        rss = peak_rss_mb(server.process.pid)
+    return {
+        "throughput_rps": successful / elapsed,
+        "p99_ms": histogram.percentile(0.99),
+        "p50_ms": histogram.percentile(0.50),
+        "peak_rss_mb": rss,
+        "failed_requests": failed,
+    }
+
+
+def median_metrics(runs):
+    """Metric-wise median of repeated runs; failed requests are summed"""
+    merged = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs if run[key] is not None]
+        if key == "failed_requests":
+            merged[key] = sum(values)
+        else:
+            merged[key] = statistics.median(values) if values else None
+    return merged
+
+
+def limit(metric, baseline, tolerance):
+    """Bound a measurement of metric may reach before it counts as a regression"""
+    if metric == "throughput_rps":
+        return baseline * (1 - tolerance["relative"])
+    return baseline * (1 + tolerance["relative"]) + tolerance.get("absolute", 0.0)
+
+
+def compare(name, result, baseline, tolerances):
+    """Regression messages for one scenario (empty when it passes)"""
+    regressions = []
+    if result["failed_requests"]:
+        regressions.append(f"{name}: {result['failed_requests']} failed requests")
+    for metric in METRICS:
+        if result[metric] is None or baseline.get(metric) is None:
+            continue
+        if metric == "throughput_rps" and SCENARIOS[name]["kind"] == "open":
+            # Equals the offered rate while the server keeps up
+            continue
+        bound = limit(metric, baseline[metric], tolerances[metric])
+        worse = result[metric] < bound if metric == "throughput_rps" else result[metric] > bound
+        if worse:
+            regressions.append(f"{name}: {metric} {result[metric]:.2f} vs baseline {baseline[metric]:.2f} "
+                               f"(limit {bound:.2f})")
+    return regressions
+
+
+def load_baselines(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"tolerances": DEFAULT_TOLERANCES, "scenario_tolerances": SCENARIO_TOLERANCES, "scenarios": {}}
+
+
+def scenario_tolerances(name, baselines):
+    """Tolerance bands for scenario name: the global ones, overridden per metric for the scenario"""
+    overrides = {**SCENARIO_TOLERANCES, **baselines.get("scenario_tolerances", {})}.get(name, {})
+    return {**DEFAULT_TOLERANCES, **baselines.get("tolerances", {}), **overrides}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Performance regression suite against stored baselines")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--baselines", default=BASELINES_FILE)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="Runs per scenario; the median is compared (and recorded as the baseline)")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="Store these results as the new baselines instead of comparing")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra server environment (repeatable)")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    env = {**SERVER_ENV, **dict(value.split("=", 1) for value in args.env)}
+    baselines = load_baselines(args.baselines)
+    if not args.update_baselines and baselines.get("env", env) != env:
+        print(f"Note: baselines were recorded with server environment {baselines['env']}")
+
+    results = {}
+    regressions = []
+    print(f"{'scenario':>14} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'RSS MB':>8}  status")
+    for name in args.scenarios:
+        result = median_metrics([measure(SCENARIOS[name], env) for _ in range(args.repeat)])
+        results[name] = result
+        baseline = baselines["scenarios"].get(name)
+        if args.update_baselines:
+            status = "recorded"
+        elif baseline is None:
+            status = "no baseline"
+        else:
+            found = compare(name, result, baseline, scenario_tolerances(name, baselines))
+            regressions.extend(found)
+            status = "REGRESSION" if found else "ok"
+        rss = f"{result['peak_rss_mb']:.1f}" if result["peak_rss_mb"] is not None else "-"
+        print(f"{name:>14} {result['throughput_rps']:>9.1f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {rss:>8}  {status}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"env": env, "results": results, "regressions": regressions}, f, indent=2)
+
+    if args.update_baselines:
+        for name, result in results.items():
+            baselines["scenarios"][name] = {metric: round(result[metric], 2) if result[metric] is not None else None
+                                            for metric in METRICS}
+        baselines["tolerances"] = {**DEFAULT_TOLERANCES, **baselines.get("tolerances", {})}
+        baselines["scenario_tolerances"] = {**SCENARIO_TOLERANCES, **baselines.get("scenario_tolerances", {})}
+        baselines["env"] = env
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=2)
+            f.write("\n")
+        print(f"\nBaselines written to {args.baselines}")
+        return
+
+    if regressions:
+        print("\nRegressions:")
+        for message in regressions:
+            print(f"  {message}")
+        sys.exit(1)
+    print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
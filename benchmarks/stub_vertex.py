@@ -0,0 +1,118 @@
+"""
+Local HTTP stand-in for a Vertex AI endpoint, for client-side benchmarks.
+
+A GET on the endpoint resource plays the metadata lookup that
+aiplatform.Endpoint(...) does, and a POST to :predict the prediction.
+StubEndpoint looks the endpoint up when it is constructed and keeps a pool
+of kept-alive connections, so concurrent predictions run in parallel the
+way they do over a real Endpoint's multiplexed channel.
+"""
+
+import http.client
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubVertexHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    lookup_latency = 0.0
+    predict_latency = 0.0
+    predict_latency_per_instance = 0.0
+    predict_requests = 0
+    predicted_instances = 0
+
+    def _reply(self, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        time.sleep(self.lookup_latency)
+        self._reply({"name": self.path, "deployedModels": [{"id": "stub"}]})
+
+    def do_POST(self):
+        instances = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["instances"]
+        cls = type(self)
+        cls.predict_requests += 1
+        cls.predicted_instances += len(instances)
+        time.sleep(self.predict_latency + self.predict_latency_per_instance * len(instances))
+        self._reply({"predictions": [{"label": "POSITIVE", "score": 1.0, "text": instance.get("text")}
+                                     for instance in instances]})
+
+    def log_message(self, *args):
+        pass
+
+
+class StubVertexServer:
+    """Context manager serving StubVertexHandler on a free local port"""
+
+    def __init__(self, lookup_latency=0.0, predict_latency=0.0, predict_latency_per_instance=0.0):
+        self.handler = type("Handler", (StubVertexHandler,), {
+            "lookup_latency": lookup_latency,
+            "predict_latency": predict_latency,
+            "predict_latency_per_instance": predict_latency_per_instance,
+        })
+        self.server = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    def __enter__(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def endpoint_factory(self, project, location, endpoint_id):
+        """PredictionClient endpoint_factory connecting to this server"""
+        return StubEndpoint(self.port, endpoint_id)
+
+
+class StubPrediction:
+    def __init__(self, predictions):
+        self.predictions = predictions
+
+
+class StubEndpoint:
+    """Endpoint look-alike over a pool of HTTP/1.1 keep-alive connections"""
+
+    def __init__(self, port, endpoint_id):
+        self.port = port
+        self.path = f"/v1/endpoints/{endpoint_id}"
+        self.pool = queue.SimpleQueue()
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        connection.request("GET", self.path)
+        connection.getresponse().read()
+        self.pool.put(connection)
+
+    def predict(self, instances, parameters=None):
+        try:
+            connection = self.pool.get_nowait()
+        except queue.Empty:
+            connection = http.client.HTTPConnection("127.0.0.1", self.port)
+        # Bytes, so headers and body go out in one send (no Nagle / delayed ACK stall)
+        body = json.dumps({"instances": instances, "parameters": parameters}).encode("utf-8")
+        try:
+            connection.request("POST", f"{self.path}:predict", body, {"Content-Type": "application/json"})
+            return StubPrediction(json.loads(connection.getresponse().read())["predictions"])
+        finally:
+            self.pool.put(connection)
+
+    def close(self):
+        while True:
+            try:
+                self.pool.get_nowait().close()
+            except queue.Empty:
+                return
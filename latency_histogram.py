@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+HDR-style latency histogram for the load generator
+
+Values are recorded in microseconds into log-linear buckets: every power of
+two is split into SUB_BUCKETS linear sub-buckets, so any recorded value is
+reported within 2 / SUB_BUCKETS (under 1%) of its true value, from 1 us to
+hours, in a few kilobytes no matter how many values are recorded.
+
+Histograms are mergeable: counts from several runs or processes add up
+bucket by bucket, and the merged percentiles are as accurate as if every
+value had been recorded into one histogram.
+"""
+
+SUB_BUCKET_BITS = 8
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+
+
+def bucket_index(value):
+    """Bucket of a non-negative integer value"""
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value >> shift) - HALF_SUB_BUCKETS
+
+
+def bucket_range(index):
+    """(lowest, highest) values that land in bucket index"""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift, offset = divmod(index - SUB_BUCKETS, HALF_SUB_BUCKETS)
+    shift += 1
+    lowest = (offset + HALF_SUB_BUCKETS) << shift
+    return lowest, lowest + (1 << shift) - 1
+
+
+class LatencyHistogram:
+    """Mergeable log-linear histogram of latencies in milliseconds"""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_us = 0
+        self.min_us = None
+        self.max_us = None
+
+    def record(self, latency_ms):
+        value = max(0, int(latency_ms * 1000))
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_us += value
+        if self.min_us is None or value < self.min_us:
+            self.min_us = value
+        if self.max_us is None or value > self.max_us:
+            self.max_us = value
+
+    def merge(self, other):
+        """Add other's recorded values to this histogram"""
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total_us += other.total_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        if other.max_us is not None and (self.max_us is None or other.max_us > self.max_us):
+            self.max_us = other.max_us
+        return self
+
+    def percentile(self, q):
+        """Latency in ms at quantile q (0-1): the highest value of the bucket it falls in"""
+        if not self.count:
+            return 0.0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_range(index)[1], self.max_us) / 1000
+        return self.max_us / 1000
+
+    def mean(self):
+        return self.total_us / self.count / 1000 if self.count else 0.0
+
+    def min(self):
+        return self.min_us / 1000 if self.min_us is not None else 0.0
+
+    def max(self):
+        return self.max_us / 1000 if self.max_us is not None else 0.0
+
+    def summary(self):
+        """Percentiles and extremes in ms"""
+        return {
+            "count": self.count,
+            "average": self.mean(),
+            "min": self.min(),
+            "p50": self.percentile(0.50),
+            "p90": self.percentile(0.90),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "p999": self.percentile(0.999),
+            "max": self.max(),
+        }
+
+    def to_dict(self):
+        return {
+            "sub_bucket_bits": SUB_BUCKET_BITS,
+            "count": self.count,
+            "total_us": self.total_us,
+            "min_us": self.min_us,
+            "max_us": self.max_us,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("sub_bucket_bits", SUB_BUCKET_BITS) != SUB_BUCKET_BITS:
+            raise ValueError(f"Histogram was recorded with {data['sub_bucket_bits']} sub-bucket bits, "
+                             f"expected {SUB_BUCKET_BITS}")
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total_us = data["total_us"]
+        histogram.min_us = data["min_us"]
+        histogram.max_us = data["max_us"]
+        return histogram
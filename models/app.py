@@ -1,32 +1,99 @@
+import logging
+import os
+
 from flask import Flask, request, jsonify
-from transformers import pipeline
+
+from inference_batcher import InferenceBatcher
+from model_loader import MODEL_NAME, ModelLoader
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# Serving configuration
+BATCHING = os.getenv("BATCHING", "true").lower() == "true"
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "16"))  # Max texts per model call
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", "0.005"))  # Seconds to wait for more texts
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))  # Intra-op threads (torch or ONNX Runtime), 0 = default
+TORCH_NUM_INTEROP_THREADS = int(os.getenv("TORCH_NUM_INTEROP_THREADS", "0"))  # Inter-op threads, 0 = torch default
+MODEL_DIR = os.getenv("MODEL_DIR", "")  # Saved model baked into the image; empty = download from the Hub
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "torch")  # "torch" or "onnx" (ONNX Runtime)
+ONNX_QUANTIZE = os.getenv("ONNX_QUANTIZE", "true").lower() == "true"  # Use the int8 ONNX model
+PORT = int(os.getenv("PORT", "8080"))
 
 app = Flask(__name__)
 
 # Initialize a lightweight transformer model
-# Using a small model to stay within free tier limits
-classifier = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+# Using a small model to stay within free tier limits.
+# It loads in the background so the server answers probes right away.
+loader = ModelLoader(MODEL_NAME, MODEL_DIR, BATCH_SIZE, TORCH_NUM_THREADS, TORCH_NUM_INTEROP_THREADS,
+                     backend=MODEL_BACKEND, quantize=ONNX_QUANTIZE).start()
+
+# Concurrent requests share model calls instead of running one text at a time
+batcher = InferenceBatcher(loader.classify, BATCH_SIZE, BATCH_TIMEOUT) if BATCHING else None
+
 
 @app.route('/predict', methods=['POST'])
 def predict():
-    data = request.get_json()
-    
-    if 'text' not in data:
+    if not loader.ready.is_set():
+        return jsonify({'error': 'Model is loading' if loader.error is None else 'Model failed to load'}), 503
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No text provided'}), 400
+
+    # Either {"text": "..."} or a list as {"texts": [...]} / {"text": [...]}
+    texts = data.get('texts', data.get('text'))
+    if texts is None:
         return jsonify({'error': 'No text provided'}), 400
-    
-    text = data['text']
-    
+    single = isinstance(texts, str)
+    if single:
+        texts = [texts]
+    if not texts or not all(isinstance(text, str) for text in texts):
+        return jsonify({'error': 'text must be a string or a non-empty list of strings'}), 400
+
     # Perform inference
-    result = classifier(text)
-    
+    results = batcher.predict(texts) if batcher else loader.classify(texts)
+
+    if single:
+        return jsonify({
+            'text': texts[0],
+            'prediction': results
+        })
     return jsonify({
-        'text': text,
-        'prediction': result
+        'texts': texts,
+        'predictions': results
     })
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy'})
+    return jsonify({'status': 'healthy', 'ready': loader.ready.is_set()})
+
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    # Alive while loading; a failed load needs a restart
+    if loader.error is not None:
+        return jsonify({'status': 'failed', 'error': loader.error}), 500
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready', methods=['GET'])
+def health_ready():
+    status = loader.status()
+    return jsonify(status), 200 if status['ready'] else 503
+
+@app.route('/config', methods=['GET'])
+def config():
+    torch = loader.torch
+    return jsonify({
+        'batching': BATCHING,
+        'batch_size': BATCH_SIZE,
+        'batch_timeout': BATCH_TIMEOUT,
+        'model_source': loader.source,
+        'model_backend': MODEL_BACKEND,
+        'onnx_quantize': ONNX_QUANTIZE if MODEL_BACKEND == 'onnx' else None,
+        'torch_num_threads': torch.get_num_threads() if torch else None,
+        'torch_num_interop_threads': torch.get_num_interop_threads() if torch else None,
+        'batches': batcher.batches if batcher else None,
+        'batched_items': batcher.items if batcher else None,
+    })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8080)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=PORT, threaded=True)
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Streaming batch-prediction pipeline for large JSONL files
+
+Instances are read one line at a time, grouped into requests of chunk_size
+instances, and sent with at most max_in_flight requests outstanding, so
+memory stays bounded by the chunks in flight no matter how large the input
+is. Results are appended to a JSONL output file as each chunk completes, one
+line per instance with its 0-based position in the input.
+
+A checkpoint file next to the output records every chunk whose results have
+been written, together with the output size at that point. Re-running with
+--resume truncates anything written after the last checkpoint and skips the
+chunks already done. Chunks that still fail after retries are not
+checkpointed, so a resumed run retries them.
+
+The endpoint client is swappable:
+    vertex  a Vertex AI endpoint (PROJECT_ID / LOCATION / ENDPOINT_ID)
+    local   the batching server in server/app.py, through POST /infer_batch
+    stub    an in-process fake, for dry runs and benchmarks
+
+Usage:
+    python batch_pipeline.py input.jsonl predictions.jsonl --client local --url http://localhost:8080
+"""
+
+import argparse
+import itertools
+import json
+import os
+import time
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from prediction_client import get_client
+
+PROJECT_ID = "golden-capsule-479805-q9"
+LOCATION = "us-central1"
+ENDPOINT_ID = "YOUR_ENDPOINT_ID"  # Replace with your actual endpoint ID
+
+DEFAULT_CHUNK_SIZE = 64
+DEFAULT_MAX_IN_FLIGHT = 4
+
+
+class VertexEndpointClient:
+    """Sends instances to a deployed Vertex AI endpoint"""
+
+    def __init__(self, project=PROJECT_ID, location=LOCATION, endpoint_id=ENDPOINT_ID):
+        self.client = get_client(project, location, endpoint_id)
+
+    def predict(self, instances):
+        return list(self.client.predict(instances).predictions)
+
+
+class LocalServerClient:
+    """Sends instances to server/app.py's /infer_batch endpoint"""
+
+    def __init__(self, url="http://localhost:8080", timeout=60.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def predict(self, instances):
+        body = json.dumps({"inputs": [instance_text(instance) for instance in instances]}).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}/infer_batch", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["results"]
+
+
+class StubClient:
+    """Fake endpoint that labels every instance after a fixed per-request latency"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def predict(self, instances):
+        if self.latency:
+            time.sleep(self.latency)
+        return [{"label": "POSITIVE", "score": 1.0, "length": len(instance_text(instance))}
+                for instance in instances]
+
+
+def instance_text(instance):
+    """The input text of an instance ({"text": ...}, {"input_text": ...} or a plain string)"""
+    if isinstance(instance, str):
+        return instance
+    return instance.get("text", instance.get("input_text", ""))
+
+
+def make_client(name, url=None, stub_latency=0.0):
+    """
+    Create an endpoint client by name
+
+    Args:
+        name (str): "vertex", "local" or "stub"
+        url (str): Server URL for the local client
+
+    Returns:
+        An object with predict(instances) -> list of predictions
+    """
+    if name == "vertex":
+        return VertexEndpointClient()
+    if name == "local":
+        return LocalServerClient(url or "http://localhost:8080")
+    if name == "stub":
+        return StubClient(stub_latency)
+    raise ValueError(f"Unknown client '{name}'. Use 'vertex', 'local' or 'stub'")
+
+
+def iter_instances(path):
+    """
+    Yield instances from a JSONL file one line at a time.
+    A .json file in the old {"instances": [...]} format is still accepted,
+    but it is loaded whole, so use JSONL for large inputs.
+    """
+    if path.endswith(".json"):
+        with open(path, "r") as f:
+            yield from json.load(f).get("instances", [])
+        return
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class Checkpoint:
+    """Append-only record of finished chunks and the output size after each"""
+
+    def __init__(self, path, chunk_size):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.done = set()
+        self.output_size = 0
+        self._valid_size = 0
+        self._file = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("chunk_size", self.chunk_size) != self.chunk_size:
+                raise ValueError(f"{self.path} was written with chunk_size {header['chunk_size']}, "
+                                 f"resume with the same chunk size")
+            self._valid_size = f.tell()
+            for line in f:
+                # A torn final line from an interrupted run ends the valid part
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self.done.add(record["chunk"])
+                self.output_size = max(self.output_size, record["output_size"])
+                self._valid_size += len(line)
+
+    def reset(self):
+        """Forget the loaded chunks; open() then starts a fresh checkpoint file"""
+        self.done = set()
+        self.output_size = 0
+        self._valid_size = 0
+
+    def open(self, resume):
+        # Nothing valid to keep without a loaded header (missing or empty file)
+        new = not resume or not self._valid_size
+        self._file = open(self.path, "w" if new else "r+")
+        if new:
+            self._file.write(json.dumps({"chunk_size": self.chunk_size}) + "\n")
+            self._file.flush()
+        else:
+            # Cut off a torn final line so new records start on a line of their own
+            self._file.truncate(self._valid_size)
+            self._file.seek(self._valid_size)
+
+    def mark(self, chunk_index, output_size):
+        self.done.add(chunk_index)
+        self.output_size = output_size
+        self._file.write(json.dumps({"chunk": chunk_index, "output_size": output_size}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class PipelineResult:
+    """Summary of a pipeline run"""
+
+    def __init__(self):
+        self.processed = 0
+        self.skipped = 0
+        self.failed_chunks = []
+        self.elapsed = 0.0
+        # In input order when the pipeline was asked to collect them, else None
+        self.predictions = None
+
+    def __repr__(self):
+        return (f"PipelineResult(processed={self.processed}, skipped={self.skipped}, "
+                f"failed_chunks={len(self.failed_chunks)}, elapsed={self.elapsed:.2f}s)")
+
+
+def _predict_with_retries(client, instances, retries, backoff):
+    for attempt in range(retries + 1):
+        try:
+            predictions = client.predict(instances)
+            if len(predictions) != len(instances):
+                raise ValueError(f"{len(predictions)} predictions for {len(instances)} instances")
+            return predictions
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def run_pipeline(input_path, output_path=None, client=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 max_in_flight=DEFAULT_MAX_IN_FLIGHT, resume=False, retries=2, backoff=0.5,
+                 collect=False):
+    """
+    Stream instances from input_path through client in chunks
+
+    Args:
+        input_path (str): JSONL input, one instance per line
+        output_path (str): JSONL output, one {"index", "prediction"} line per instance
+        client: Endpoint client (see make_client); defaults to the Vertex AI endpoint
+        chunk_size (int): Instances per predict request
+        max_in_flight (int): Concurrent predict requests
+        resume (bool): Continue from output_path's checkpoint instead of starting over
+        collect (bool): Also keep predictions in memory (small inputs only)
+
+    Returns:
+        PipelineResult: counts, failed chunk indexes and, with collect, the predictions
+    """
+    client = client or VertexEndpointClient()
+    result = PipelineResult()
+    collected = {} if collect else None
+    start = time.time()
+
+    checkpoint = out = None
+    if output_path is not None:
+        checkpoint = Checkpoint(output_path + ".checkpoint", chunk_size)
+        if resume:
+            checkpoint.load()
+            existing = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+            if existing < checkpoint.output_size:
+                # Results the checkpoint counts on are gone: extending the file would fill it with NULs
+                print(f"{output_path} is shorter than its checkpoint ({existing} < {checkpoint.output_size} "
+                      f"bytes), starting over")
+                checkpoint.reset()
+        out = open(output_path, "r+" if resume and os.path.exists(output_path) else "w")
+        # Drop results written after the last checkpoint; their chunks run again
+        out.truncate(checkpoint.output_size)
+        out.seek(checkpoint.output_size)
+        checkpoint.open(resume)
+
+    def finish(future):
+        chunk_index, first, instances = in_flight.pop(future)
+        try:
+            predictions = future.result()
+        except Exception as e:
+            print(f"Chunk {chunk_index} (instances {first}-{first + len(instances) - 1}) failed: {e}")
+            result.failed_chunks.append(chunk_index)
+            return
+        if out is not None:
+            out.write("".join(json.dumps({"index": first + i, "prediction": prediction}) + "\n"
+                              for i, prediction in enumerate(predictions)))
+            out.flush()
+            checkpoint.mark(chunk_index, out.tell())
+        if collected is not None:
+            for i, prediction in enumerate(predictions):
+                collected[first + i] = prediction
+        result.processed += len(predictions)
+
+    instances = iter_instances(input_path)
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+            for chunk_index in itertools.count():
+                chunk = list(itertools.islice(instances, chunk_size))
+                if not chunk:
+                    break
+                if checkpoint is not None and chunk_index in checkpoint.done:
+                    result.skipped += len(chunk)
+                    continue
+                while len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(future)
+                future = pool.submit(_predict_with_retries, client, chunk, retries, backoff)
+                in_flight[future] = (chunk_index, chunk_index * chunk_size, chunk)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future)
+    finally:
+        if out is not None:
+            out.close()
+            checkpoint.close()
+
+    if collected is not None:
+        result.predictions = [collected[index] for index in sorted(collected)]
+    result.elapsed = time.time() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream a JSONL file of instances through a prediction endpoint")
+    parser.add_argument("input", help="JSONL input, one instance per line")
+    parser.add_argument("output", help="JSONL output, one prediction per line")
+    parser.add_argument("--client", default="vertex", choices=["vertex", "local", "stub"])
+    parser.add_argument("--url", default="http://localhost:8080", help="Server URL for --client local")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Instances per request")
+    parser.add_argument("--max-in-flight", type=int, default=DEFAULT_MAX_IN_FLIGHT, help="Concurrent requests")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per failed request")
+    parser.add_argument("--resume", action="store_true", help="Skip chunks recorded in the checkpoint")
+    args = parser.parse_args()
+
+    result = run_pipeline(
+        args.input, args.output,
+        client=make_client(args.client, args.url),
+        chunk_size=args.chunk_size,
+        max_in_flight=args.max_in_flight,
+        resume=args.resume,
+        retries=args.retries,
+    )
+    rate = result.processed / result.elapsed if result.elapsed else 0.0
+    print(f"Processed {result.processed} instances in {result.elapsed:.1f}s ({rate:.1f}/s), "
+          f"skipped {result.skipped} already done, {len(result.failed_chunks)} chunks failed")
+    if result.failed_chunks:
+        print("Re-run with --resume to retry the failed chunks")
+
+
+if __name__ == "__main__":
+    main()
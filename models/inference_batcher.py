@@ -0,0 +1,81 @@
+"""
+Request-coalescing batcher for the sentiment service
+
+Request threads hand their texts to one background thread, which gathers
+everything that arrives within batch_timeout (up to batch_size texts) and
+runs the pipeline once on the whole list. PyTorch releases the GIL inside
+its kernels, so request threads keep parsing and serializing while a batch
+runs, and the next batch fills up in the meantime.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class InferenceBatcher:
+    """Runs predict_fn on lists of texts collected from concurrent callers"""
+
+    def __init__(self, predict_fn, batch_size=16, batch_timeout=0.005):
+        self.predict_fn = predict_fn
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts):
+        """Queue a list of texts; returns a Future for the list of their results"""
+        future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def predict(self, texts, timeout=None):
+        """Results for texts, computed as part of a shared batch"""
+        return self.submit(texts).result(timeout)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            requests = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.batch_timeout
+            while size < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Finish this batch, then stop
+                    self._queue.put(None)
+                    break
+                requests.append(item)
+                size += len(item[0])
+            self._run_batch(requests)
+
+    def _run_batch(self, requests):
+        texts = [text for request_texts, _ in requests for text in request_texts]
+        try:
+            results = self.predict_fn(texts)
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.items += len(texts)
+        position = 0
+        for request_texts, future in requests:
+            future.set_result(results[position:position + len(request_texts)])
+            position += len(request_texts)
@@ -11,14 +11,21 @@ def create_prediction_script():
 Make predictions using a deployed model from Vertex AI Model Garden
 """
 
-import json
-from google.cloud import aiplatform
+from batch_pipeline import DEFAULT_CHUNK_SIZE, DEFAULT_MAX_IN_FLIGHT, VertexEndpointClient, run_pipeline
+from micro_batcher import MicroBatcher
+from prediction_client import get_client
 
 # Configuration - Update these values after deploying your model
 PROJECT_ID = "golden-capsule-479805-q9"
 LOCATION = "us-central1"
 ENDPOINT_ID = "YOUR_ENDPOINT_ID"  # Replace with your actual endpoint ID
 
+# Client-side micro-batching for make_prediction_async
+MICRO_BATCH_SIZE = 32  # Max instances per request
+MICRO_BATCH_WAIT = 0.005  # Seconds to wait for more instances
+
+_batcher = None
+
 def make_prediction(text):
     """
     Make a prediction using the deployed model
@@ -30,17 +37,14 @@ def make_prediction(text):
         dict: Prediction results
     """
     try:
-        # Initialize Vertex AI
-        aiplatform.init(project=PROJECT_ID, location=LOCATION)
-        
-        # Get the endpoint
-        endpoint = aiplatform.Endpoint(ENDPOINT_ID)
+        # Shared client: Vertex AI is initialized and the endpoint looked up once per process
+        client = get_client(PROJECT_ID, LOCATION, ENDPOINT_ID)
         
         # Prepare instances
         instances = [{"text": text}]
         
         # Make prediction
-        predictions = endpoint.predict(instances=instances)
+        predictions = client.predict(instances)
         
         return predictions
         
@@ -48,37 +52,67 @@ def make_prediction(text):
         print(f"Error making prediction: {e}")
         return None
 
-def batch_predict_from_file(filename):
+async def make_prediction_async(text):
     """
-    Make batch predictions from a JSON file
+    Make a prediction, sent in one request together with other concurrent calls
+    
+    Concurrent calls (e.g. asyncio.gather over many texts) are collected into
+    a single instances list of up to MICRO_BATCH_SIZE, waiting at most
+    MICRO_BATCH_WAIT seconds, and the predictions are split back out.
     
     Args:
-        filename (str): Path to JSON file with instances
+        text (str): Input text for prediction
         
     Returns:
-        list: List of predictions
+        dict: Prediction for this text
     """
+    global _batcher
     try:
-        # Load instances from file
-        with open(filename, 'r') as f:
-            data = json.load(f)
-            
-        instances = data.get('instances', [])
+        if _batcher is None:
+            _batcher = MicroBatcher(get_client(PROJECT_ID, LOCATION, ENDPOINT_ID),
+                                    max_instances=MICRO_BATCH_SIZE, max_wait=MICRO_BATCH_WAIT)
+        return await _batcher.predict({"text": text})
         
-        if not instances:
-            print("No instances found in the file")
-            return []
-            
-        # Initialize Vertex AI
-        aiplatform.init(project=PROJECT_ID, location=LOCATION)
-        
-        # Get the endpoint
-        endpoint = aiplatform.Endpoint(ENDPOINT_ID)
+    except Exception as e:
+        print(f"Error making prediction: {e}")
+        return None
+
+def batch_predict_from_file(filename, output_path=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                            max_in_flight=DEFAULT_MAX_IN_FLIGHT, resume=False, client=None):
+    """
+    Make batch predictions from a JSONL file (or a JSON file with "instances")
+    
+    The file is streamed in chunks with a bounded number of requests in flight
+    (see batch_pipeline.py), so it can be much larger than memory when
+    output_path is given.
+    
+    Args:
+        filename (str): Path to JSONL file with one instance per line
+        output_path (str): Write predictions here as JSONL instead of keeping them in memory
+        chunk_size (int): Instances per predict request
+        max_in_flight (int): Concurrent predict requests
+        resume (bool): Continue an interrupted run from output_path's checkpoint
+        client: Endpoint client (defaults to the Vertex AI endpoint)
         
-        # Make batch prediction
-        predictions = endpoint.predict(instances=instances)
+    Returns:
+        PipelineResult: Counts and, without output_path, the list of predictions
+    """
+    try:
+        result = run_pipeline(
+            filename, output_path,
+            client=client or VertexEndpointClient(PROJECT_ID, LOCATION, ENDPOINT_ID),
+            chunk_size=chunk_size,
+            max_in_flight=max_in_flight,
+            resume=resume,
+            collect=output_path is None,
+        )
         
-        return predictions
+        if result.processed == 0 and not result.failed_chunks:
+            print("No instances found in the file")
+        elif result.failed_chunks:
+            print(f"{len(result.failed_chunks)} chunks failed; re-run with resume=True to retry them")
+            
+        return result
         
     except Exception as e:
         print(f"Error making batch prediction: {e}")
@@ -111,7 +145,10 @@ def main():
     # batch_result = batch_predict_from_file("sample_request.json")
     # if batch_result:
     #     print("Batch predictions:")
-    #     print(json.dumps(batch_result.predictions, indent=2))
+    #     print(batch_result.predictions)
+    
+    # For large JSONL files, stream the predictions to a file instead:
+    # batch_predict_from_file("instances.jsonl", output_path="predictions.jsonl", resume=True)
 
 if __name__ == "__main__":
     main()
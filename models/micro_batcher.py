@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Client-side micro-batching for Vertex AI endpoint predictions
+
+Every make_prediction call sends one instance, so a caller fanning out many
+predictions pays one round trip each. MicroBatcher gathers the instances of
+concurrent callers into a single predict request: a batch goes out as soon
+as it holds max_instances, or max_wait seconds after its first instance
+arrived, and each caller gets back the prediction at its own position.
+
+    batcher = MicroBatcher(get_client(PROJECT_ID, LOCATION, ENDPOINT_ID))
+    predictions = await asyncio.gather(*(batcher.predict({"text": t}) for t in texts))
+
+A failed request fails every caller in that batch with the same exception.
+"""
+
+import asyncio
+
+DEFAULT_MAX_INSTANCES = 32
+DEFAULT_MAX_WAIT = 0.005
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-instance predictions into batched requests"""
+
+    def __init__(self, client, max_instances=DEFAULT_MAX_INSTANCES, max_wait=DEFAULT_MAX_WAIT,
+                 max_in_flight=None):
+        self.client = client
+        self.max_instances = max_instances
+        self.max_wait = max_wait
+        # Optional cap on concurrent requests to the endpoint
+        self.max_in_flight = max_in_flight
+
+        self._loop = None
+        self._pending = []  # (instance, future)
+        self._timer = None
+        self._tasks = set()
+        self._semaphore = None
+
+        self.requests_sent = 0
+        self.instances_sent = 0
+
+    def _bind(self, loop):
+        # Futures and timers belong to one event loop; rebind when a new loop
+        # (e.g. a second asyncio.run) starts using the batcher
+        if self._loop is not loop:
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+            self._tasks = set()
+            self._semaphore = asyncio.Semaphore(self.max_in_flight) if self.max_in_flight else None
+
+    async def predict(self, instance):
+        """
+        Predict one instance as part of the next batch
+
+        Args:
+            instance (dict): Instance to predict, e.g. {"text": "..."}
+
+        Returns:
+            The prediction for this instance
+        """
+        loop = asyncio.get_running_loop()
+        self._bind(loop)
+        future = loop.create_future()
+        self._pending.append((instance, future))
+        if len(self._pending) >= self.max_instances:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.max_instances]
+            del self._pending[:self.max_instances]
+            task = self._loop.create_task(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch):
+        # Callers that gave up while waiting are not sent
+        batch = [(instance, future) for instance, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            if self._semaphore is not None:
+                async with self._semaphore:
+                    response = await self.client.predict_async([instance for instance, _ in batch])
+            else:
+                response = await self.client.predict_async([instance for instance, _ in batch])
+            predictions = list(response.predictions)
+            if len(predictions) != len(batch):
+                raise ValueError(f"Endpoint returned {len(predictions)} predictions for {len(batch)} instances")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.requests_sent += 1
+            self.instances_sent += len(batch)
+        for (_, future), prediction in zip(batch, predictions):
+            if not future.done():
+                future.set_result(prediction)
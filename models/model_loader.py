@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Model loading for the sentiment service
+
+The service used to download and build the pipeline at import time, so the
+process could not answer anything until the model was fetched from the Hub.
+ModelLoader instead loads in a background thread, after the HTTP server is
+up, and records how long each phase took:
+
+    import     torch / transformers (deferred until loading starts)
+    tokenizer  tokenizer files
+    model      weights; safetensors from a local directory are memory-mapped,
+               so pages are read from the image on demand instead of copied
+    pipeline   pipeline construction
+    warmup     one tiny batch so the first real request is not the slowest
+
+With backend="onnx" the model phase opens an ONNX Runtime session on the
+exported (optionally int8-quantized) model instead, and torch is never
+imported; see onnx_backend.py.
+
+Weights are read from MODEL_DIR when it holds a saved model, else from the
+Hub. Bake them (and the ONNX exports) into the image at build time with:
+
+    python model_loader.py /app/model --onnx
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
+
+def has_local_model(model_dir):
+    return bool(model_dir) and os.path.isfile(os.path.join(model_dir, "config.json"))
+
+
+class ModelLoader:
+    """Loads the sentiment pipeline in the background and reports readiness"""
+
+    def __init__(self, model_name=MODEL_NAME, model_dir=None, batch_size=16,
+                 num_threads=0, num_interop_threads=0, backend="torch", quantize=True):
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unknown model backend '{backend}'. Use 'torch' or 'onnx'")
+        self.model_name = model_name
+        self.model_dir = model_dir
+        self.backend = backend
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.num_threads = num_threads
+        self.num_interop_threads = num_interop_threads
+
+        self.ready = threading.Event()
+        self.error = None
+        self.source = None
+        self.timings = {}
+        self.torch = None
+        self.classifier = None
+        self._thread = None
+
+    def start(self):
+        """Begin loading in a daemon thread; returns immediately"""
+        self._thread = threading.Thread(target=self._load_safely, name="model-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until the model is ready; raises the load error if loading failed"""
+        if self._thread is None:
+            self.start()
+        self._thread.join(timeout)
+        if self.error is not None:
+            raise RuntimeError(f"Model failed to load: {self.error}")
+        return self.ready.is_set()
+
+    def _load_safely(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Model failed to load")
+
+    def _phase(self, name, started):
+        self.timings[name] = round(time.perf_counter() - started, 3)
+        return time.perf_counter()
+
+    def load(self):
+        start = time.perf_counter()
+        if self.backend == "onnx":
+            self._load_onnx()
+        else:
+            self._load_torch()
+        self.timings["total"] = round(time.perf_counter() - start, 3)
+        self.ready.set()
+        logger.info(f"Model loaded from {self.source} ({self.backend}) in {self.timings['total']:.2f}s: "
+                    f"{self.timings}")
+
+    def _resolve_source(self):
+        local = has_local_model(self.model_dir)
+        self.source = self.model_dir if local else self.model_name
+        if not local and self.model_dir:
+            logger.warning(f"No saved model in {self.model_dir}; downloading {self.model_name}")
+        return local
+
+    def _load_torch(self):
+        started = time.perf_counter()
+
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+        self.torch = torch
+        # Thread pools must be sized before the model runs anything
+        if self.num_threads > 0:
+            torch.set_num_threads(self.num_threads)
+        if self.num_interop_threads > 0:
+            torch.set_num_interop_threads(self.num_interop_threads)
+        started = self._phase("import", started)
+
+        local = self._resolve_source()
+        tokenizer = AutoTokenizer.from_pretrained(self.source, local_files_only=local)
+        started = self._phase("tokenizer", started)
+
+        model = AutoModelForSequenceClassification.from_pretrained(
+            self.source, local_files_only=local, use_safetensors=True if local else None)
+        model.eval()
+        started = self._phase("model", started)
+
+        self.classifier = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+        started = self._phase("pipeline", started)
+
+        self.classify(["warm up"])
+        self._phase("warmup", started)
+
+    def _load_onnx(self):
+        started = time.perf_counter()
+
+        from transformers import AutoConfig, AutoTokenizer
+        from onnx_backend import OnnxClassifier, export_onnx, onnx_path
+        started = self._phase("import", started)
+
+        local = self._resolve_source()
+        tokenizer = AutoTokenizer.from_pretrained(self.source, local_files_only=local)
+        config = AutoConfig.from_pretrained(self.source, local_files_only=local)
+        started = self._phase("tokenizer", started)
+
+        path = onnx_path(self.model_dir, self.quantize) if local else None
+        if path is None or not os.path.isfile(path):
+            # Not baked into the image: export now, which needs torch
+            from transformers import AutoModelForSequenceClassification
+            export_dir = self.model_dir if local else tempfile.mkdtemp(prefix="onnx-")
+            logger.warning(f"No ONNX export in {export_dir}; exporting {self.source}")
+            model = AutoModelForSequenceClassification.from_pretrained(self.source, local_files_only=local)
+            export_onnx(model, tokenizer, export_dir)
+            path = onnx_path(export_dir, self.quantize)
+            started = self._phase("export", started)
+
+        self.classifier = OnnxClassifier(path, tokenizer, config.id2label, self.num_threads, self.batch_size)
+        started = self._phase("model", started)
+
+        self.classify(["warm up"])
+        self._phase("warmup", started)
+
+    def classify(self, texts):
+        """Run the model on a list of texts; one result dict per text"""
+        if self.torch is None:
+            return self.classifier(texts, batch_size=self.batch_size)
+        with self.torch.inference_mode():
+            return self.classifier(texts, batch_size=self.batch_size)
+
+    def status(self):
+        return {
+            "ready": self.ready.is_set(),
+            "error": self.error,
+            "source": self.source,
+            "backend": self.backend,
+            "load_seconds": self.timings,
+        }
+
+
+def save_model(model_dir, model_name=MODEL_NAME, onnx=False):
+    """Download the model and save it to model_dir with safetensors weights (and ONNX exports)"""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    tokenizer.save_pretrained(model_dir)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.save_pretrained(model_dir, safe_serialization=True)
+    print(f"Saved {model_name} to {model_dir}")
+    if onnx:
+        from onnx_backend import export_onnx
+
+        for path in export_onnx(model, tokenizer, model_dir):
+            print(f"Exported {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Save the sentiment model for offline loading")
+    parser.add_argument("model_dir", help="Directory to save the model into")
+    parser.add_argument("--onnx", action="store_true", help="Also export fp32 and int8 ONNX models")
+    args = parser.parse_args()
+    save_model(args.model_dir, onnx=args.onnx)
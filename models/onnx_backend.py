@@ -0,0 +1,107 @@
+"""
+ONNX Runtime backend for the sentiment model
+
+export_onnx() traces the PyTorch model to ONNX with dynamic batch and
+sequence axes, and also writes a copy with dynamic int8 quantization: the
+weights of the MatMul / Gemm layers are stored as int8 and activations are
+quantized on the fly, which cuts model size by about 4x and speeds up CPU
+inference. OnnxClassifier runs either file with ONNX Runtime and returns
+the same {"label", "score"} dicts as the transformers pipeline, so torch is
+not needed at serving time.
+"""
+
+import os
+
+ONNX_SUBDIR = "onnx"
+FP32_FILE = "model.onnx"
+INT8_FILE = "model.int8.onnx"
+
+
+def onnx_path(model_dir, quantize):
+    return os.path.join(model_dir, ONNX_SUBDIR, INT8_FILE if quantize else FP32_FILE)
+
+
+def export_onnx(model, tokenizer, model_dir, opset=14):
+    """
+    Export model to model_dir/onnx as fp32 and dynamically quantized int8
+
+    Args:
+        model: transformers sequence classification model
+        tokenizer: Its tokenizer, used to build the tracing inputs
+        model_dir (str): Directory to write the onnx/ subdirectory into
+
+    Returns:
+        tuple: (fp32 path, int8 path)
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    class Logits(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    os.makedirs(os.path.join(model_dir, ONNX_SUBDIR), exist_ok=True)
+    fp32_path = onnx_path(model_dir, quantize=False)
+    int8_path = onnx_path(model_dir, quantize=True)
+
+    sample = tokenizer(["export sample text", "a second, longer export sample text"],
+                       padding=True, return_tensors="pt")
+    model.eval()
+    with torch.inference_mode():
+        torch.onnx.export(
+            Logits(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=opset,
+        )
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return fp32_path, int8_path
+
+
+class OnnxClassifier:
+    """Text classifier running an exported model on ONNX Runtime"""
+
+    def __init__(self, model_path, tokenizer, id2label, num_threads=0, batch_size=16, max_length=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.tokenizer = tokenizer
+        self.id2label = {int(index): label for index, label in id2label.items()}
+        self.batch_size = batch_size
+        # Longer inputs are cut like in the transformers pipeline instead of overrunning the position embeddings
+        self.max_length = max_length or tokenizer.model_max_length
+
+    def __call__(self, texts, batch_size=None):
+        import numpy as np
+
+        batch_size = batch_size or self.batch_size
+        results = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                     max_length=self.max_length, return_tensors="np")
+            feeds = {name: value.astype(np.int64) for name, value in encoded.items() if name in self.input_names}
+            logits = self.session.run(None, feeds)[0]
+            # Softmax, shifted for numerical stability
+            exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+            probabilities = exp / exp.sum(axis=-1, keepdims=True)
+            for row in probabilities:
+                best = int(row.argmax())
+                results.append({"label": self.id2label[best], "score": float(row[best])})
+        return results
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Long-lived Vertex AI prediction client
+
+aiplatform.init and aiplatform.Endpoint(...) look up endpoint metadata and
+open a new gRPC channel to the prediction service, which costs far more than
+a prediction round trip. PredictionClient does that once and keeps the
+Endpoint: its prediction service channel multiplexes concurrent requests
+over one kept-alive HTTP/2 connection, so every later predict reuses it.
+
+Use get_client() to share one client per (project, location, endpoint) in a
+process:
+
+    client = get_client(PROJECT_ID, LOCATION, ENDPOINT_ID)
+    result = client.predict([{"text": "hello"}])
+    result = await client.predict_async([{"text": "hello"}])
+"""
+
+import asyncio
+import threading
+
+PROJECT_ID = "golden-capsule-479805-q9"
+LOCATION = "us-central1"
+
+_clients = {}
+_clients_lock = threading.Lock()
+_initialized = set()
+
+
+def _vertex_endpoint(project, location, endpoint_id):
+    from google.cloud import aiplatform
+
+    if (project, location) not in _initialized:
+        aiplatform.init(project=project, location=location)
+        _initialized.add((project, location))
+    return aiplatform.Endpoint(endpoint_id)
+
+
+class PredictionClient:
+    """Initializes Vertex AI once and reuses one Endpoint handle for every prediction"""
+
+    def __init__(self, project, location, endpoint_id, endpoint_factory=None):
+        self.project = project
+        self.location = location
+        self.endpoint_id = endpoint_id
+        # Builds the endpoint object; swap in a stub for local runs and benchmarks
+        self._endpoint_factory = endpoint_factory or _vertex_endpoint
+        self._endpoint = None
+        self._lock = threading.Lock()
+
+    @property
+    def endpoint(self):
+        """The Endpoint, created on first use"""
+        if self._endpoint is None:
+            with self._lock:
+                if self._endpoint is None:
+                    self._endpoint = self._endpoint_factory(self.project, self.location, self.endpoint_id)
+        return self._endpoint
+
+    def predict(self, instances, parameters=None):
+        """
+        Make a prediction on the shared endpoint
+
+        Args:
+            instances (list): Instances to predict
+            parameters (dict): Optional prediction parameters
+
+        Returns:
+            Prediction: The endpoint's response (predictions in .predictions)
+        """
+        return self.endpoint.predict(instances=instances, parameters=parameters)
+
+    async def predict_async(self, instances, parameters=None):
+        """Async predict: the endpoint's native async call when it has one, else a worker thread"""
+        endpoint = self.endpoint
+        if hasattr(endpoint, "predict_async"):
+            return await endpoint.predict_async(instances=instances, parameters=parameters)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: endpoint.predict(instances=instances, parameters=parameters))
+
+    def close(self):
+        """Drop the endpoint handle; the next predict creates a new one"""
+        with self._lock:
+            self._endpoint = None
+
+
+def get_client(project=PROJECT_ID, location=LOCATION, endpoint_id=None, endpoint_factory=None):
+    """
+    The shared PredictionClient for an endpoint, created on first use
+
+    Args:
+        project (str): Google Cloud project
+        location (str): Vertex AI region
+        endpoint_id (str): Endpoint ID
+        endpoint_factory: Optional callable (project, location, endpoint_id) -> endpoint
+
+    Returns:
+        PredictionClient
+    """
+    key = (project, location, endpoint_id)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = PredictionClient(project, location, endpoint_id, endpoint_factory)
+            _clients[key] = client
+    return client
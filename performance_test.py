@@ -1,14 +1,55 @@
 #!/usr/bin/env python3
 """
 Performance testing script for the optimized inference server
+
+The default open-loop mode sends requests on a fixed arrival schedule at a
+target rate, whether or not earlier requests have finished, and measures
+each latency from the request's intended send time. A slow server therefore
+shows up as queueing latency instead of silently lowering the offered load
+(coordinated omission), which is what the closed-loop mode does: there,
+--clients clients each wait for a response before sending the next request.
+
+Arrival schedules (--schedule):
+    constant  evenly spaced at --rate requests/second
+    poisson   exponential inter-arrival times averaging --rate (seeded)
+    step      --steps equal steps ramping from --start-rate up to --rate
+
+Latencies go into an HDR-style histogram (latency_histogram.py) reported as
+p50/p90/p99/p99.9. All requests share one aiohttp session and connection
+pool sized by --connections.
+
+Results are aggregated as they arrive (histograms and error counts by
+class), so memory does not grow with the number of requests and the
+summary in performance_test_results.json stays a few kilobytes. --trace
+FILE adds a per-request CSV written incrementally.
+
+One asyncio process saturates a single core. --processes N splits the load
+across N local worker processes, and --worker-hosts adds workers on other
+machines (each started with --serve HOST:PORT; the coordinator sends a job
+as one JSON line and gets the worker's serialized histograms back). All
+workers follow one global schedule from a common start time, each sending
+every N-th request, and their histograms are merged into a single report.
+
+Usage:
+    python performance_test.py --rate 200 --duration 30 --schedule poisson
+    python performance_test.py --mode closed --clients 100 --requests-per-client 10
+    python performance_test.py --rate 5000 --processes 4
+    python performance_test.py --serve 0.0.0.0:9100            # on each load host
+    python performance_test.py --rate 20000 --worker-hosts host1:9100,host2:9100
 """
 
+import argparse
 import asyncio
 import aiohttp
+import csv
+import multiprocessing
+import random
 import time
-import statistics
-from typing import List
 import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from latency_histogram import LatencyHistogram
 
 # Configuration
 SERVER_URL = "http://localhost:8080"
@@ -16,158 +57,442 @@ NUM_CONCURRENT_REQUESTS = 100
 REQUESTS_PER_CLIENT = 10
 TOTAL_REQUESTS = NUM_CONCURRENT_REQUESTS * REQUESTS_PER_CLIENT
 
-async def send_request(session, request_id):
-    """Send a single inference request"""
+# Open-loop defaults
+TARGET_RPS = 100.0
+TEST_DURATION = 10.0
+MAX_CONNECTIONS = 256
+REQUEST_TIMEOUT = 30.0
+MAX_SAMPLE_ERRORS = 5
+WORKER_PROTOCOL_LIMIT = 1 << 24  # Max bytes of one job / result line between coordinator and worker
+
+
+def arrival_offsets(schedule, rate, duration, start_rate=None, steps=5, seed=0):
+    """
+    Yield intended send times, in seconds from the start of the test
+
+    Args:
+        schedule (str): "constant", "poisson" or "step"
+        rate (float): Target requests per second (the final rate for "step")
+        duration (float): Seconds of arrivals
+        start_rate (float): First step's rate for "step" (default rate / steps)
+        steps (int): Number of equal-length steps for "step"
+        seed (int): Random seed for "poisson"
+    """
+    if schedule == "constant":
+        for i in range(int(rate * duration)):
+            yield i / rate
+    elif schedule == "poisson":
+        rng = random.Random(seed)
+        offset = rng.expovariate(rate)
+        while offset < duration:
+            yield offset
+            offset += rng.expovariate(rate)
+    elif schedule == "step":
+        start_rate = start_rate if start_rate is not None else rate / steps
+        step_duration = duration / steps
+        for step in range(steps):
+            step_rate = start_rate + (rate - start_rate) * step / max(1, steps - 1)
+            step_start = step * step_duration
+            for i in range(int(step_rate * step_duration)):
+                yield step_start + i / step_rate
+    else:
+        raise ValueError(f"Unknown schedule '{schedule}'. Use 'constant', 'poisson' or 'step'")
+
+
+def make_session(connections, timeout):
+    """One shared session: a pooled keep-alive connector sized for the whole test"""
+    connector = aiohttp.TCPConnector(
+        limit=connections,
+        limit_per_host=connections,
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout))
+
+
+def error_class(e):
+    """Short, bounded-cardinality name for a failed request's cause"""
+    if isinstance(e, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(e, aiohttp.ClientConnectionError):
+        return "connection"
+    if isinstance(e, aiohttp.ClientError):
+        return "client"
+    return type(e).__name__
+
+
+class ResultAggregator:
+    """
+    Streaming summary of request results
+
+    Each result is folded into latency histograms and error counters as it
+    arrives and then dropped, so memory stays constant however long the test
+    runs. With trace_path, one compact CSV row per request is also written
+    incrementally. Aggregators from separate runs or processes merge exactly.
+    """
+
+    TRACE_FIELDS = ["request_id", "intended_offset_s", "latency_ms", "service_time_ms", "outcome"]
+
+    def __init__(self, trace_path=None):
+        self.latency = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.total = 0
+        self.successful = 0
+        self.errors = Counter()
+        self.sample_errors = []
+        self._trace_file = None
+        self._trace = None
+        if trace_path:
+            self._trace_file = open(trace_path, "w", newline="", buffering=1 << 16)
+            self._trace = csv.writer(self._trace_file)
+            self._trace.writerow(self.TRACE_FIELDS)
+
+    def record(self, result, request_id, intended_offset=None):
+        self.total += 1
+        if result["success"]:
+            self.successful += 1
+            self.latency.record(result["latency_ms"])
+            self.service_time.record(result["service_time_ms"])
+            outcome = "ok"
+        else:
+            outcome = result["error_class"]
+            self.errors[outcome] += 1
+            if len(self.sample_errors) < MAX_SAMPLE_ERRORS:
+                self.sample_errors.append(result["error"])
+        if self._trace is not None:
+            self._trace.writerow([
+                request_id,
+                f"{intended_offset:.6f}" if intended_offset is not None else "",
+                f"{result['latency_ms']:.3f}",
+                f"{result['service_time_ms']:.3f}",
+                outcome,
+            ])
+
+    def merge(self, other):
+        self.latency.merge(other.latency)
+        self.service_time.merge(other.service_time)
+        self.total += other.total
+        self.successful += other.successful
+        self.errors.update(other.errors)
+        self.sample_errors.extend(other.sample_errors[:MAX_SAMPLE_ERRORS - len(self.sample_errors)])
+        return self
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "successful": self.successful,
+            "errors": dict(self.errors),
+            "sample_errors": self.sample_errors,
+            "latency_histogram": self.latency.to_dict(),
+            "service_time_histogram": self.service_time.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregator = cls()
+        aggregator.total = data["total"]
+        aggregator.successful = data["successful"]
+        aggregator.errors = Counter(data["errors"])
+        aggregator.sample_errors = list(data["sample_errors"])
+        aggregator.latency = LatencyHistogram.from_dict(data["latency_histogram"])
+        aggregator.service_time = LatencyHistogram.from_dict(data["service_time_histogram"])
+        return aggregator
+
+    def close(self):
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = self._trace = None
+
+
+async def send_request(session, request_id, intended_time=None):
+    """
+    Send a single inference request
+
+    Latency runs from intended_time (the scheduled send time in open-loop
+    mode) when given, else from the actual send; service time always runs
+    from the actual send. The response body is read and discarded.
+    """
     payload = {
         "input_text": f"This is test input number {request_id} for performance testing"
     }
-    
-    start_time = time.time()
+
+    start_time = time.perf_counter()
+    intended_time = intended_time if intended_time is not None else start_time
     try:
         async with session.post(f"{SERVER_URL}/infer", json=payload) as response:
-            end_time = time.time()
-            latency = (end_time - start_time) * 1000  # Convert to milliseconds
-            
-            if response.status == 200:
-                result = await response.json()
-                return {
-                    "success": True,
-                    "latency_ms": latency,
-                    "response": result
-                }
-            else:
-                return {
-                    "success": False,
-                    "latency_ms": latency,
-                    "error": f"HTTP {response.status}"
-                }
+            await response.read()
+            end_time = time.perf_counter()
+            result = {
+                "success": response.status == 200,
+                "latency_ms": (end_time - intended_time) * 1000,
+                "service_time_ms": (end_time - start_time) * 1000,
+            }
+            if response.status != 200:
+                result["error_class"] = f"http_{response.status}"
+                result["error"] = f"HTTP {response.status}"
+            return result
     except Exception as e:
-        end_time = time.time()
-        latency = (end_time - start_time) * 1000
+        end_time = time.perf_counter()
         return {
             "success": False,
-            "latency_ms": latency,
-            "error": str(e)
+            "latency_ms": (end_time - intended_time) * 1000,
+            "service_time_ms": (end_time - start_time) * 1000,
+            "error_class": error_class(e),
+            "error": str(e) or type(e).__name__
         }
 
-async def client_worker(client_id: int, results: List[dict]):
-    """Worker that sends multiple requests"""
-    async with aiohttp.ClientSession() as session:
-        for i in range(REQUESTS_PER_CLIENT):
-            request_id = client_id * REQUESTS_PER_CLIENT + i
-            result = await send_request(session, request_id)
-            result["client_id"] = client_id
-            result["request_id"] = request_id
-            results.append(result)
-            # Small delay to simulate realistic request patterns
-            await asyncio.sleep(0.01)
-
-async def run_performance_test():
-    """Run the performance test"""
-    print(f"Starting performance test with {NUM_CONCURRENT_REQUESTS} concurrent clients")
-    print(f"Each client will send {REQUESTS_PER_CLIENT} requests")
-    print(f"Total requests: {TOTAL_REQUESTS}")
-    print("-" * 50)
-    
-    # Collect results
-    results = []
-    
-    # Start time
-    test_start_time = time.time()
-    
-    # Create tasks for all clients
-    tasks = [
-        client_worker(i, results) 
-        for i in range(NUM_CONCURRENT_REQUESTS)
-    ]
-    
-    # Run all clients concurrently
-    await asyncio.gather(*tasks)
-    
-    # End time
-    test_end_time = time.time()
-    total_test_time = test_end_time - test_start_time
-    
-    # Analyze results
-    successful_requests = [r for r in results if r["success"]]
-    failed_requests = [r for r in results if not r["success"]]
-    
-    total_requests = len(results)
-    success_rate = len(successful_requests) / total_requests * 100 if total_requests > 0 else 0
-    
+async def client_worker(session, client_id: int, requests_per_client: int, aggregator: ResultAggregator):
+    """Closed-loop worker that sends requests one after another"""
+    for i in range(requests_per_client):
+        request_id = client_id * requests_per_client + i
+        aggregator.record(await send_request(session, request_id), request_id)
+        # Small delay to simulate realistic request patterns
+        await asyncio.sleep(0.01)
+
+async def run_closed_loop(session, clients, requests_per_client, aggregator):
+    await asyncio.gather(*(
+        client_worker(session, i, requests_per_client, aggregator)
+        for i in range(clients)
+    ))
+
+async def run_open_loop(session, offsets, aggregator, test_start=None):
+    """
+    Send one request per (request_id, offset) at its scheduled time, never
+    waiting for responses. Only requests still in flight are held in memory.
+    """
+    in_flight = set()
+    test_start = test_start if test_start is not None else time.perf_counter()
+
+    async def scheduled(request_id, offset):
+        result = await send_request(session, request_id, test_start + offset)
+        aggregator.record(result, request_id, offset)
+
+    for request_id, offset in offsets:
+        delay = test_start + offset - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(scheduled(request_id, offset))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+def test_config(args):
+    return {
+        "server_url": SERVER_URL,
+        "mode": args.mode,
+        "schedule": args.schedule if args.mode == "open" else None,
+        "target_rps": args.rate if args.mode == "open" else None,
+        "duration_seconds": args.duration if args.mode == "open" else None,
+        "concurrent_clients": args.clients if args.mode == "closed" else None,
+        "requests_per_client": args.requests_per_client if args.mode == "closed" else None,
+        "connections": args.connections,
+    }
+
+def report(aggregator, total_test_time, config, output, trace=None):
+    """Print the summary of a finished test and save it to output as JSON"""
+    total_requests = aggregator.total
+    successful = aggregator.successful
+    failed = total_requests - successful
+    success_rate = successful / total_requests * 100 if total_requests > 0 else 0
+
     # Latency statistics
-    latencies = [r["latency_ms"] for r in successful_requests]
-    
-    if latencies:
-        avg_latency = statistics.mean(latencies)
-        median_latency = statistics.median(latencies)
-        p95_latency = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
-        min_latency = min(latencies)
-        max_latency = max(latencies)
-    else:
-        avg_latency = median_latency = p95_latency = min_latency = max_latency = 0
-    
+    latency_stats = aggregator.latency.summary()
+    latency_stats["median"] = latency_stats["p50"]
+    service_stats = aggregator.service_time.summary()
+
     # Throughput calculation
     throughput = total_requests / total_test_time if total_test_time > 0 else 0
-    
+
     # Print results
     print("Performance Test Results")
     print("=" * 50)
     print(f"Total Test Time: {total_test_time:.2f} seconds")
     print(f"Total Requests: {total_requests}")
-    print(f"Successful Requests: {len(successful_requests)} ({success_rate:.1f}%)")
-    print(f"Failed Requests: {len(failed_requests)}")
+    print(f"Successful Requests: {successful} ({success_rate:.1f}%)")
+    print(f"Failed Requests: {failed}")
     print(f"Throughput: {throughput:.2f} requests/second")
     print()
-    print("Latency Statistics (ms):")
-    print(f"  Average: {avg_latency:.2f}")
-    print(f"  Median: {median_latency:.2f}")
-    print(f"  95th Percentile: {p95_latency:.2f}")
-    print(f"  Min: {min_latency:.2f}")
-    print(f"  Max: {max_latency:.2f}")
+    label = "from intended send time" if config["mode"] == "open" else "per request"
+    print(f"Latency Statistics (ms, {label}):")
+    print(f"  Average: {latency_stats['average']:.2f}")
+    for name in ("p50", "p90", "p99", "p999"):
+        print(f"  {name}: {latency_stats[name]:.2f}")
+    print(f"  Min: {latency_stats['min']:.2f}")
+    print(f"  Max: {latency_stats['max']:.2f}")
+    if config["mode"] == "open":
+        print(f"Service Time (ms, from actual send): p50 {service_stats['p50']:.2f}   "
+              f"p99 {service_stats['p99']:.2f}")
     print()
-    
-    # Print first few errors if any
-    if failed_requests:
+
+    # Print error counts and a few messages if any
+    if aggregator.errors:
+        print("Errors by class:")
+        for name, count in aggregator.errors.most_common():
+            print(f"  {name}: {count}")
         print("Sample Errors:")
-        for i, failed in enumerate(failed_requests[:5]):
-            print(f"  {i+1}. {failed['error']}")
-        if len(failed_requests) > 5:
-            print(f"  ... and {len(failed_requests) - 5} more errors")
-    
-    # Save detailed results to file
+        for i, message in enumerate(aggregator.sample_errors):
+            print(f"  {i+1}. {message}")
+
+    # Save the summary (histograms included, no per-request data) to file
     detailed_results = {
-        "test_config": {
-            "server_url": SERVER_URL,
-            "concurrent_clients": NUM_CONCURRENT_REQUESTS,
-            "requests_per_client": REQUESTS_PER_CLIENT,
-            "total_requests": TOTAL_REQUESTS
-        },
+        "test_config": config,
         "test_results": {
             "total_test_time_seconds": total_test_time,
             "total_requests": total_requests,
-            "successful_requests": len(successful_requests),
-            "failed_requests": len(failed_requests),
+            "successful_requests": successful,
+            "failed_requests": failed,
             "success_rate_percent": success_rate,
             "throughput_requests_per_second": throughput
         },
-        "latency_stats_ms": {
-            "average": avg_latency,
-            "median": median_latency,
-            "p95": p95_latency,
-            "min": min_latency,
-            "max": max_latency
-        },
-        "all_results": results
+        "latency_stats_ms": latency_stats,
+        "service_time_stats_ms": service_stats,
+        "errors_by_class": dict(aggregator.errors),
+        "latency_histogram": aggregator.latency.to_dict(),
+        "service_time_histogram": aggregator.service_time.to_dict(),
+        "trace_file": trace,
     }
-    
-    with open("performance_test_results.json", "w") as f:
+
+    with open(output, "w") as f:
         json.dump(detailed_results, f, indent=2)
-    
-    print(f"Detailed results saved to performance_test_results.json")
-    
+
+    print(f"Summary saved to {output}")
+    if trace:
+        print(f"Per-request trace written to {trace}")
+
     return detailed_results
 
+async def run_performance_test(args):
+    """Run the performance test"""
+    if args.mode == "open":
+        print(f"Starting open-loop test: {args.schedule} arrivals at {args.rate} req/s for {args.duration}s")
+        if args.schedule == "step":
+            print(f"Ramping in {args.steps} steps from {args.start_rate or args.rate / args.steps} req/s")
+    else:
+        print(f"Starting closed-loop test with {args.clients} concurrent clients")
+        print(f"Each client will send {args.requests_per_client} requests")
+        print(f"Total requests: {args.clients * args.requests_per_client}")
+    print("-" * 50)
+
+    aggregator = ResultAggregator(args.trace)
+
+    # Start time
+    test_start_time = time.perf_counter()
+
+    try:
+        async with make_session(args.connections, args.timeout) as session:
+            if args.mode == "open":
+                offsets = arrival_offsets(args.schedule, args.rate, args.duration, args.start_rate, args.steps, args.seed)
+                await run_open_loop(session, enumerate(offsets), aggregator, test_start_time)
+            else:
+                await run_closed_loop(session, args.clients, args.requests_per_client, aggregator)
+    finally:
+        aggregator.close()
+
+    # End time
+    total_test_time = time.perf_counter() - test_start_time
+
+    return report(aggregator, total_test_time, test_config(args), args.output, args.trace)
+
+async def run_worker_load(job):
+    """
+    Run one worker's share of a distributed test; returns its aggregator as a dict
+
+    Every worker generates the same global schedule and sends the requests
+    whose index is its own modulo the worker count (closed-loop: every
+    workers-th client), starting at the shared wall-clock time start_wall.
+    """
+    global SERVER_URL
+    args = argparse.Namespace(**job["args"])
+    SERVER_URL = args.url.rstrip("/")
+    index, workers = job["index"], job["workers"]
+
+    aggregator = ResultAggregator(f"{args.trace}.{index}" if args.trace else None)
+    try:
+        async with make_session(args.connections, args.timeout) as session:
+            # Same instant on every worker (and host, given synchronized clocks)
+            test_start = time.perf_counter() + (job["start_wall"] - time.time())
+            if args.mode == "open":
+                offsets = arrival_offsets(args.schedule, args.rate, args.duration, args.start_rate, args.steps, args.seed)
+                share = ((i, offset) for i, offset in enumerate(offsets) if i % workers == index)
+                await run_open_loop(session, share, aggregator, test_start)
+            else:
+                await asyncio.sleep(max(0.0, test_start - time.perf_counter()))
+                await asyncio.gather(*(
+                    client_worker(session, client_id, args.requests_per_client, aggregator)
+                    for client_id in range(index, args.clients, workers)
+                ))
+    finally:
+        aggregator.close()
+    return aggregator.to_dict()
+
+def run_worker_process(job):
+    """Process pool entry point for a local worker"""
+    return asyncio.run(run_worker_load(job))
+
+async def serve_worker(address):
+    """
+    Run as a remote load worker: accept one JSON job per connection from a
+    coordinator, run it, and answer with one JSON line holding the result
+    """
+    host, port = address.rsplit(":", 1)
+
+    async def handle(reader, writer):
+        job = json.loads(await reader.readline())
+        print(f"Running worker {job['index'] + 1}/{job['workers']} against {job['args']['url']}")
+        try:
+            reply = {"ok": True, "result": await run_worker_load(job)}
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+        await writer.drain()
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, int(port), limit=WORKER_PROTOCOL_LIMIT)
+    print(f"Load worker listening on {address}")
+    async with server:
+        await server.serve_forever()
+
+async def run_remote_worker(address, job):
+    host, port = address.rsplit(":", 1)
+    reader, writer = await asyncio.open_connection(host, int(port), limit=WORKER_PROTOCOL_LIMIT)
+    writer.write((json.dumps(job) + "\n").encode("utf-8"))
+    await writer.drain()
+    reply = json.loads(await reader.readline())
+    writer.close()
+    if not reply["ok"]:
+        raise RuntimeError(f"Worker {address} failed: {reply['error']}")
+    return reply["result"]
+
+async def run_distributed_test(args):
+    """Coordinate --processes local workers and --worker-hosts remote ones, then merge their results"""
+    hosts = [host for host in (args.worker_hosts or "").split(",") if host]
+    workers = args.processes + len(hosts)
+    if args.mode == "open":
+        print(f"Starting open-loop test: {args.schedule} arrivals at {args.rate} req/s for {args.duration}s")
+    else:
+        print(f"Starting closed-loop test with {args.clients} concurrent clients")
+    print(f"Load split across {args.processes} local processes and {len(hosts)} remote workers")
+    print("-" * 50)
+
+    start_wall = time.time() + args.start_delay
+    jobs = [{"args": vars(args), "index": index, "workers": workers, "start_wall": start_wall}
+            for index in range(workers)]
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=max(1, args.processes), mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = [loop.run_in_executor(pool, run_worker_process, job) for job in jobs[:args.processes]]
+        pending += [run_remote_worker(host, job) for host, job in zip(hosts, jobs[args.processes:])]
+        results = await asyncio.gather(*pending)
+    total_test_time = time.time() - start_wall
+
+    aggregator = ResultAggregator()
+    for result in results:
+        aggregator.merge(ResultAggregator.from_dict(result))
+    config = test_config(args)
+    config["workers"] = {"local_processes": args.processes, "remote": hosts}
+    trace = f"{args.trace}.<worker>" if args.trace else None
+    return report(aggregator, total_test_time, config, args.output, trace)
+
 async def check_server_health():
     """Check if the server is running"""
     try:
@@ -183,20 +508,56 @@ async def check_server_health():
         print(f"✗ Could not connect to server: {e}")
         return False
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the inference server")
+    parser.add_argument("--url", default=SERVER_URL, help="Server base URL")
+    parser.add_argument("--mode", default="open", choices=["open", "closed"],
+                        help="open: fixed arrival schedule; closed: clients wait for each response")
+    parser.add_argument("--schedule", default="constant", choices=["constant", "poisson", "step"])
+    parser.add_argument("--rate", type=float, default=TARGET_RPS, help="Target requests/second (final rate for step)")
+    parser.add_argument("--duration", type=float, default=TEST_DURATION, help="Seconds of arrivals")
+    parser.add_argument("--start-rate", type=float, default=None, help="First step's rate for --schedule step")
+    parser.add_argument("--steps", type=int, default=5, help="Steps for --schedule step")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for --schedule poisson")
+    parser.add_argument("--clients", type=int, default=NUM_CONCURRENT_REQUESTS, help="Closed-loop clients")
+    parser.add_argument("--requests-per-client", type=int, default=REQUESTS_PER_CLIENT)
+    parser.add_argument("--connections", type=int, default=MAX_CONNECTIONS, help="Connection pool size")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-request timeout in seconds")
+    parser.add_argument("--output", default="performance_test_results.json", help="JSON summary file")
+    parser.add_argument("--trace", default=None, help="Also write one CSV row per request to this file")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="Local load-generating processes sharing the schedule")
+    parser.add_argument("--worker-hosts", default=None,
+                        help="Comma-separated host:port of remote workers started with --serve")
+    parser.add_argument("--start-delay", type=float, default=2.0,
+                        help="Seconds between dispatching a distributed test and its common start time")
+    parser.add_argument("--serve", metavar="HOST:PORT", default=None,
+                        help="Run as a remote load worker for a coordinator")
+    return parser.parse_args(argv)
+
 async def main():
     """Main function"""
+    global SERVER_URL
+    args = parse_args()
+    SERVER_URL = args.url.rstrip("/")
+
+    if args.serve:
+        await serve_worker(args.serve)
+        return
+    distributed = args.processes > 1 or bool(args.worker_hosts)
+
     print("DeepSeek Inference Server Performance Test")
     print("=" * 50)
-    
+
     # Check server health first
     if not await check_server_health():
         print("Server is not accessible. Please make sure the server is running.")
         return
-    
+
     # Run performance test
     try:
-        results = await run_performance_test()
-        
+        results = await (run_distributed_test(args) if distributed else run_performance_test(args))
+
         # Print summary
         print("\n" + "=" * 50)
         print("TEST SUMMARY")
@@ -204,8 +565,8 @@ async def main():
         print(f"Throughput: {results['test_results']['throughput_requests_per_second']:.2f} req/sec")
         print(f"Success Rate: {results['test_results']['success_rate_percent']:.1f}%")
         print(f"Avg Latency: {results['latency_stats_ms']['average']:.2f} ms")
-        print(f"95th Percentile: {results['latency_stats_ms']['p95']:.2f} ms")
-        
+        print(f"99th Percentile: {results['latency_stats_ms']['p99']:.2f} ms")
+
     except KeyboardInterrupt:
         print("\nTest interrupted by user")
     except Exception as e:
@@ -214,4 +575,4 @@ async def main():
         traceback.print_exc()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
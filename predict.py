@@ -1,8 +1,10 @@
-from google.cloud import aiplatform
+import os
+import sys
 import time
 
-# Initialize Vertex AI
-aiplatform.init(project="golden-capsule-479805-q9", location="us-central1")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+
+from prediction_client import get_client  # noqa: E402
 
 # Read the endpoint ID from the file
 try:
@@ -13,9 +15,10 @@ except FileNotFoundError:
     print("Endpoint ID file not found. Please run create_endpoint.py first.")
     exit(1)
 
-# Create an endpoint object
+# Shared prediction client: initializes Vertex AI and looks up the endpoint once
 try:
-    endpoint = aiplatform.Endpoint(ENDPOINT_ID)
+    client = get_client("golden-capsule-479805-q9", "us-central1", ENDPOINT_ID)
+    endpoint = client.endpoint
     print("Endpoint connected successfully")
 except Exception as e:
     print(f"Error connecting to endpoint: {e}")
@@ -41,7 +44,7 @@ try:
     # Make a prediction (this will fail if no model is deployed)
     print("\nMaking prediction...")
     start_time = time.time()
-    prediction = endpoint.predict(instances=prediction_data)
+    prediction = client.predict(prediction_data)
     end_time = time.time()
     
     print("Prediction results:")
@@ -8,6 +8,8 @@ import sys
 import os
 import argparse
 
+from apply_performance_profile import load_profiles
+
 def run_command(command, description):
     """Run a command and handle errors"""
     print(f"\n{description}")
@@ -30,8 +32,14 @@ def run_command(command, description):
 def main():
     parser = argparse.ArgumentParser(description='Run inference optimization workflow')
     parser.add_argument('--profile', default='production',
-                        choices=['development', 'production', 'high_throughput', 'cost_optimized'],
+                        choices=list(load_profiles()['profiles']),
                         help='Performance profile to apply')
+    parser.add_argument('--tune', action='store_true',
+                        help='Tune a profile against a local server first and apply it instead of --profile')
+    parser.add_argument('--tune-args', default='',
+                        help='Extra arguments for tune_performance_profile.py, e.g. "--rate 300 --p99-ms 250"')
+    parser.add_argument('--url', default='http://localhost:8080',
+                        help='Server URL for the performance test')
     parser.add_argument('--skip-deploy', action='store_true',
                         help='Skip deployment step')
     parser.add_argument('--skip-test', action='store_true',
@@ -42,6 +50,15 @@ def main():
     print("DeepSeek Inference Optimization Workflow")
     print("=" * 50)
     
+    # Step 0: Tune a profile against a locally launched server
+    if args.tune:
+        print("\n0. Tuning performance profile against a local server...")
+        if not run_command(f"python tune_performance_profile.py --profile-name tuned {args.tune_args}",
+                          "Tuning performance profile"):
+            print("Failed to tune performance profile")
+            sys.exit(1)
+        args.profile = 'tuned'
+    
     # Step 1: Apply performance profile
     print(f"\n1. Applying {args.profile} performance profile...")
     if not run_command(f"python apply_performance_profile.py {args.profile}", 
@@ -67,11 +84,10 @@ def main():
     # Step 4: Run performance tests
     if not args.skip_test:
         print("\n4. Running performance tests...")
-        print("Note: Make sure the server is running before running tests")
-        print("You can start the server with: python -m uvicorn server.app:app --host 0.0.0.0 --port 8080")
-        input("Press Enter when the server is running, or Ctrl+C to skip...")
+        print(f"Testing the server at {args.url}")
+        print("A local server can be started with: python -m uvicorn app:app --app-dir server --host 0.0.0.0 --port 8080")
         
-        if not run_command("python performance_test.py", 
+        if not run_command(f"python performance_test.py --url {args.url}", 
                           "Running performance tests"):
             print("Performance tests failed")
             sys.exit(1)
@@ -0,0 +1,130 @@
+"""
+Closed-loop controller for the effective batch size and batch wait window.
+
+Batch workers report every batch they process: its size, processing time and
+the queue depth behind it. The controller tracks the worst request latency
+per batch (oldest item's queue wait plus processing time), and every few
+batches compares its p99 against the latency SLO:
+
+* over the SLO because batches take too long to process, it shrinks the
+  batch size multiplicatively;
+* over the SLO because requests queue up behind a backlog, it grows the
+  batch size (more throughput per batch) and shortens the wait window;
+* over the SLO without a backlog, it shortens the wait window;
+* comfortably under the SLO with a backlog, it grows the batch size additively;
+* comfortably under the SLO with underfilled batches, it widens the wait
+  window so batches fill up, never past half the SLO budget left after
+  processing.
+"""
+
+import time
+from collections import deque
+
+
+class AdaptiveBatchController:
+    """Tunes batch size and batch timeout at runtime to meet a p99 latency SLO"""
+
+    def __init__(self, batch_size, batch_timeout, latency_slo_ms, enabled=True,
+                 min_batch_size=1, max_batch_size=None, min_batch_timeout=0.0005,
+                 max_batch_timeout=None, window=256, adjust_every=16, headroom=0.8):
+        self.enabled = enabled
+        self.latency_slo_ms = latency_slo_ms
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size or batch_size * 4
+        self.min_batch_timeout = min_batch_timeout
+        self.max_batch_timeout = max_batch_timeout or latency_slo_ms / 2000
+        self.adjust_every = adjust_every
+        self.headroom = headroom
+
+        self._latencies = deque(maxlen=window)
+        self._fill_ratios = deque(maxlen=window)
+        self._processing_ema_ms = None
+        self._batches_since_adjust = 0
+        self._last_queue_depth = 0
+        self._max_queue_depth = 0
+
+        self.adjustments = 0
+        self.last_decision = "hold"
+        self.last_p99_ms = None
+        self.last_adjusted_at = None
+
+    def observe_batch(self, batch_size, processing_time_ms, queue_wait_ms, queue_depth):
+        """Record one processed batch and re-tune every adjust_every batches"""
+        self._latencies.append(queue_wait_ms + processing_time_ms)
+        self._fill_ratios.append(batch_size / self.batch_size)
+        if self._processing_ema_ms is None:
+            self._processing_ema_ms = processing_time_ms
+        else:
+            self._processing_ema_ms += 0.2 * (processing_time_ms - self._processing_ema_ms)
+        self._last_queue_depth = queue_depth
+        self._max_queue_depth = max(self._max_queue_depth, queue_depth)
+
+        self._batches_since_adjust += 1
+        if self.enabled and self._batches_since_adjust >= self.adjust_every:
+            self._batches_since_adjust = 0
+            self._adjust()
+
+    def _p99(self):
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def _adjust(self):
+        p99 = self._p99()
+        self.last_p99_ms = p99
+        self.last_adjusted_at = time.time()
+
+        # Wait window may use at most half of what the SLO leaves after processing
+        budget_s = max(0.0, (self.latency_slo_ms - self._processing_ema_ms) / 2000)
+        timeout_cap = max(self.min_batch_timeout, min(self.max_batch_timeout, budget_s))
+        avg_fill = sum(self._fill_ratios) / len(self._fill_ratios)
+
+        backlog = self._max_queue_depth >= self.batch_size
+        self._max_queue_depth = 0
+
+        if p99 > self.latency_slo_ms:
+            if self._processing_ema_ms > self.latency_slo_ms * 0.5:
+                self.batch_size = max(self.min_batch_size, int(self.batch_size * 0.75))
+                decision = "decrease_batch_size"
+            elif backlog:
+                self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+                self.batch_timeout = self.batch_timeout * 0.5
+                decision = "increase_batch_size"
+            else:
+                self.batch_timeout = self.batch_timeout * 0.5
+                decision = "decrease_timeout"
+        elif p99 < self.latency_slo_ms * self.headroom and backlog:
+            self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 8))
+            decision = "increase_batch_size"
+        elif p99 < self.latency_slo_ms * self.headroom and avg_fill < 0.5:
+            self.batch_timeout = self.batch_timeout * 1.25
+            decision = "increase_timeout"
+        else:
+            decision = "hold"
+
+        self.batch_timeout = min(timeout_cap, max(self.min_batch_timeout, self.batch_timeout))
+        if decision != "hold":
+            self.adjustments += 1
+            # Judge the new settings on fresh samples only
+            self._latencies.clear()
+            self._fill_ratios.clear()
+        self.last_decision = decision
+
+    def snapshot(self):
+        """Current decisions, as reported by /config"""
+        return {
+            "enabled": self.enabled,
+            "latency_slo_ms": self.latency_slo_ms,
+            "effective_batch_size": self.batch_size,
+            "effective_batch_timeout": self.batch_timeout,
+            "min_batch_size": self.min_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_timeout": self.max_batch_timeout,
+            "observed_p99_ms": self.last_p99_ms,
+            "processing_time_ema_ms": self._processing_ema_ms,
+            "last_queue_depth": self._last_queue_depth,
+            "last_decision": self.last_decision,
+            "adjustments": self.adjustments,
+            "last_adjusted_at": self.last_adjusted_at,
+        }
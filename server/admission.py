@@ -0,0 +1,117 @@
+"""
+Admission control for the inference server.
+
+Before a request is queued, its latency is predicted from the rows ahead of
+it and the model throughput measured over the last few seconds of batches
+(rows per second of model time, times the number of batches that run in
+parallel), plus the time of the batch it will run in. Requests whose
+predicted latency exceeds headroom times their deadline are rejected at
+once with 503, and a hard cap on queue depth rejects with 429, both carrying
+a Retry-After hint. Rejected requests never reach the queue or the model, so
+the capacity that is left goes to requests that can still finish in time.
+"""
+
+import math
+import time
+from collections import deque
+
+
+class AdmissionController:
+    """Decides whether a request can be queued and still meet its deadline"""
+
+    def __init__(self, concurrency, window=5.0, max_queue_depth=None, headroom=0.9, enabled=True):
+        self.enabled = enabled
+        self.concurrency = concurrency
+        self.window = window
+        self.max_queue_depth = max_queue_depth
+        # Fraction of the deadline a predicted latency may use; the rest
+        # absorbs prediction error and time spent outside the queue
+        self.headroom = headroom
+
+        # (timestamp, rows, busy seconds) per observation inside the window
+        self._samples = deque()
+        self._rows = 0
+        self._busy_seconds = 0.0
+        self._batches = 0
+
+        self.rejected_queue_full = 0
+        self.rejected_predicted_wait = 0
+
+    def observe(self, rows, busy_seconds):
+        """Record rows completed by the model and the model time (one batch or decode step) they took"""
+        now = time.monotonic()
+        self._samples.append((now, rows, busy_seconds))
+        self._rows += rows
+        self._busy_seconds += busy_seconds
+        if busy_seconds > 0:
+            self._batches += 1
+        self._expire(now)
+
+    def _expire(self, now):
+        samples = self._samples
+        while samples and now - samples[0][0] > self.window:
+            _, rows, busy_seconds = samples.popleft()
+            self._rows -= rows
+            self._busy_seconds -= busy_seconds
+            if busy_seconds > 0:
+                self._batches -= 1
+
+    def throughput(self):
+        """Rows per second the model sustains with every batch slot busy, or None before any data"""
+        self._expire(time.monotonic())
+        if self._rows <= 0 or self._busy_seconds <= 0:
+            return None
+        return self._rows / self._busy_seconds * self.concurrency
+
+    def batch_seconds(self):
+        """Average model time of one batch in the window, or 0.0 before any data"""
+        self._expire(time.monotonic())
+        if self._batches <= 0:
+            return 0.0
+        return self._busy_seconds / self._batches
+
+    def predicted_wait(self, rows_ahead):
+        """
+        Seconds until a request behind rows_ahead queued rows has its result:
+        draining the queue plus one batch (0 while throughput is unknown)
+        """
+        throughput = self.throughput()
+        if throughput is None:
+            return 0.0
+        return rows_ahead / throughput + self.batch_seconds()
+
+    def check(self, queue_depth, rows_ahead, deadline):
+        """
+        None to admit, else (status_code, reason, retry_after_seconds).
+        deadline is the seconds the request may wait before it times out.
+        """
+        if not self.enabled:
+            return None
+        if self.max_queue_depth and queue_depth >= self.max_queue_depth:
+            self.rejected_queue_full += 1
+            throughput = self.throughput()
+            excess = queue_depth - self.max_queue_depth + 1
+            return 429, "queue_full", _retry_after(excess / throughput if throughput else 1.0)
+        wait = self.predicted_wait(rows_ahead)
+        budget = deadline * self.headroom
+        if wait > budget:
+            self.rejected_predicted_wait += 1
+            # Roughly when enough of the queue has drained to fit the deadline again
+            return 503, "predicted_wait", _retry_after(wait - budget)
+        return None
+
+    def snapshot(self):
+        throughput = self.throughput()
+        return {
+            "enabled": self.enabled,
+            "max_queue_depth": self.max_queue_depth,
+            "window_seconds": self.window,
+            "headroom": self.headroom,
+            "throughput_rows_per_second": throughput,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_predicted_wait": self.rejected_predicted_wait,
+        }
+
+
+def _retry_after(seconds):
+    return max(1, math.ceil(seconds))
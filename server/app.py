@@ -1,162 +1,570 @@
 import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+import threading
+import weakref
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import time
 import json
 import os
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from adaptive import AdaptiveBatchController
+from admission import AdmissionController
+from backends import BackendExecutor
+from batching import BatchEntry, BatchQueue, padding_efficiency, parse_priority_classes
+from cache import ResponseCache
+from logging_pipeline import EventAggregator, setup_logging
+from metrics import CONTENT_TYPE, Registry
+from scheduler import ContinuousBatchScheduler, KVBudget
+
+# Set up logging: handlers run on a background thread behind an in-memory queue
+ASYNC_LOGGING = os.environ.get("ASYNC_LOGGING", "true").lower() in ("1", "true", "yes")
+log_queue_handlers = setup_logging(
+    os.environ.get("LOGGING_CONFIG_PATH"),
+    use_queue=ASYNC_LOGGING,
+    queue_size=int(os.environ.get("LOG_QUEUE_SIZE", 10000)),
+)
 logger = logging.getLogger(__name__)
 
+# Per-inference and per-batch events are aggregated into one summary record
+# per LOG_SUMMARY_EVERY events or LOG_SUMMARY_INTERVAL seconds, plus an
+# optional random sample of individual events. Errors are always logged in full.
+INFERENCE_LOGGING = os.environ.get("INFERENCE_LOGGING", "true").lower() in ("1", "true", "yes")
+INFERENCE_LOG_SAMPLE_RATE = float(os.environ.get("INFERENCE_LOG_SAMPLE_RATE", 0.0))
+LOG_SUMMARY_EVERY = int(os.environ.get("LOG_SUMMARY_EVERY", 1000))
+LOG_SUMMARY_INTERVAL = float(os.environ.get("LOG_SUMMARY_INTERVAL", 1.0))
+inference_events = batch_events = None
+if INFERENCE_LOGGING:
+    inference_events = EventAggregator(logger, "model_inference", LOG_SUMMARY_EVERY,
+                                       LOG_SUMMARY_INTERVAL, INFERENCE_LOG_SAMPLE_RATE)
+    batch_events = EventAggregator(logger, "batch_processed", LOG_SUMMARY_EVERY,
+                                   LOG_SUMMARY_INTERVAL, INFERENCE_LOG_SAMPLE_RATE)
+
 app = FastAPI()
 
 class RequestIn(BaseModel):
     input_text: str
+    # Priority class or tenant tag from PRIORITY_CLASSES; defaults to DEFAULT_PRIORITY_CLASS
+    priority: Optional[str] = None
+    # How long the caller will wait (or the X-Request-Timeout-Ms header); capped at REQUEST_TIMEOUT
+    timeout_ms: Optional[float] = None
 
 class ResponseOut(BaseModel):
     result: str
     latency_ms: float
 
+class BatchRequestIn(BaseModel):
+    inputs: List[str]
+    priority: Optional[str] = None
+    timeout_ms: Optional[float] = None
+
+class BatchResponseOut(BaseModel):
+    results: List[str]
+    latency_ms: float
+
+class BulkInput:
+    """Queue payload for one /infer_batch row, without a Pydantic model per row"""
+
+    __slots__ = ("input_text",)
+
+    def __init__(self, input_text):
+        self.input_text = input_text
+
 # Dynamic batching configuration
 BATCH_SIZE = int(os.environ.get("BATCH_SIZE", 32))
 BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT", 0.01))  # 10 ms default
 MAX_CONCURRENT_BATCHES = int(os.environ.get("MAX_CONCURRENT_BATCHES", 4))
 
-# Enhanced batcher with dynamic sizing
-batch_queue = []
-batch_event = asyncio.Event()
+# Adaptive batching: tune the effective batch size/timeout at runtime
+ADAPTIVE_BATCHING = os.environ.get("ADAPTIVE_BATCHING", "false").lower() in ("1", "true", "yes")
+LATENCY_SLO_MS = float(os.environ.get("LATENCY_SLO_MS", 200))
+MIN_BATCH_SIZE = int(os.environ.get("MIN_BATCH_SIZE", 1))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", BATCH_SIZE * 4))
+
+# Model backend and the pool it runs in, off the event loop
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "echo")
+MODEL_NAME = os.environ.get("MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english")
+INFERENCE_EXECUTOR = os.environ.get("INFERENCE_EXECUTOR", "thread")  # thread or process
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", MAX_CONCURRENT_BATCHES))
+
+# Scheduler: "static" runs each batch to completion; "continuous" re-forms
+# each of the MAX_CONCURRENT_BATCHES running batches at every decode step,
+# bounded by BATCH_SIZE sequences per batch and a shared KV-cache budget.
+# Continuous mode needs a backend with decode steps (e.g. mock-generate)
+# and the thread executor.
+SCHEDULER_MODE = os.environ.get("SCHEDULER_MODE", "static")
+KV_CACHE_BUDGET_TOKENS = int(os.environ.get("KV_CACHE_BUDGET_TOKENS", 65536))
+
+# Length bucketing: batch similar-length inputs together to cut padding.
+# Bounds are in tokens when the backend tokenizes in-process, else characters.
+LENGTH_BUCKETING = os.environ.get("LENGTH_BUCKETING", "true").lower() in ("1", "true", "yes")
+MAX_BUCKET_WAIT = float(os.environ.get("MAX_BUCKET_WAIT", BATCH_TIMEOUT * 10))
+
+# Requests time out after REQUEST_TIMEOUT seconds (or their own timeout_ms).
+# The deadline travels with the queued request: expired or abandoned
+# requests are dropped before they take a row in a batch.
+# With ADMISSION_CONTROL, requests whose predicted latency exceeds
+# ADMISSION_HEADROOM of that deadline are rejected up front with 503, and
+# requests arriving while MAX_QUEUE_DEPTH are queued with 429 (0 = no cap),
+# both with Retry-After.
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", 10.0))
+MAX_BULK_INPUTS = int(os.environ.get("MAX_BULK_INPUTS", 10000))
+ADMISSION_CONTROL = os.environ.get("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+MAX_QUEUE_DEPTH = int(os.environ.get("MAX_QUEUE_DEPTH", 0))
+ADMISSION_WINDOW = float(os.environ.get("ADMISSION_WINDOW", 5.0))
+ADMISSION_HEADROOM = float(os.environ.get("ADMISSION_HEADROOM", 0.9))
+
+# Priority classes share the workers by weighted fair queuing, as
+# "name:weight[:batch_size[:batch_timeout]],...". Classes without a batch
+# size/timeout use the (possibly adaptive) BATCH_SIZE/BATCH_TIMEOUT.
+PRIORITY_CLASSES = parse_priority_classes(os.environ.get("PRIORITY_CLASSES", "interactive:8,batch:1"))
+DEFAULT_PRIORITY_CLASS = os.environ.get("DEFAULT_PRIORITY_CLASS", PRIORITY_CLASSES[0].name)
+
 batch_semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+batch_controller = AdaptiveBatchController(
+    BATCH_SIZE, BATCH_TIMEOUT, LATENCY_SLO_MS,
+    enabled=ADAPTIVE_BATCHING,
+    min_batch_size=MIN_BATCH_SIZE,
+    max_batch_size=MAX_BATCH_SIZE,
+)
+
+if MODEL_BACKEND == "echo":
+    backend_kwargs = {"per_item_latency": float(os.environ.get("ECHO_LATENCY_PER_ITEM", 0.001))}
+elif MODEL_BACKEND == "mock-generate":
+    backend_kwargs = {
+        "max_new_tokens": int(os.environ.get("MOCK_MAX_NEW_TOKENS", 64)),
+        "step_latency": float(os.environ.get("MOCK_STEP_LATENCY", 0.005)),
+        "step_latency_per_sequence": float(os.environ.get("MOCK_STEP_LATENCY_PER_SEQUENCE", 0.0002)),
+    }
+else:
+    backend_kwargs = {"model_name": MODEL_NAME}
+model_executor = BackendExecutor(MODEL_BACKEND, backend_kwargs,
+                                 executor=INFERENCE_EXECUTOR, workers=INFERENCE_WORKERS)
+
+if LENGTH_BUCKETING:
+    default_buckets = "16,32,64,128,256,512" if model_executor.counts_tokens else "64,128,256,512,1024,2048"
+    LENGTH_BUCKETS = [int(b) for b in os.environ.get("LENGTH_BUCKETS", default_buckets).split(",")]
+else:
+    LENGTH_BUCKETS = []
+
+# Enhanced batcher with dynamic sizing
+batch_queue = BatchQueue(bucket_bounds=LENGTH_BUCKETS, max_bucket_wait=MAX_BUCKET_WAIT,
+                         classes=PRIORITY_CLASSES, default_class=DEFAULT_PRIORITY_CLASS)
+bucket_labels = [f"le_{bound}" for bound in LENGTH_BUCKETS] + ["inf"]
+
+admission = AdmissionController(
+    min(MAX_CONCURRENT_BATCHES, INFERENCE_WORKERS),
+    window=ADMISSION_WINDOW,
+    max_queue_depth=MAX_QUEUE_DEPTH,
+    headroom=ADMISSION_HEADROOM,
+    enabled=ADMISSION_CONTROL,
+)
+
+# Response cache in front of the batch queue (RESPONSE_CACHE_SIZE=0 disables it)
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 10000))
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", 300))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 0)) or None
+response_cache = None
+if RESPONSE_CACHE_SIZE > 0:
+    response_cache = ResponseCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_BYTES)
+# Queued entry behind each in-flight future, so coalesced callers can extend its deadline
+queued_entries = weakref.WeakKeyDictionary()
 
 # Counter for monitoring
 inference_count = 0
 error_count = 0
 batch_count = 0
+# Rows run to completion after their caller had gone, and static streaming
+# batches stopped early because every caller had gone
+wasted_rows = 0
+stopped_stream_rows = 0
+
+# Performance metrics, served in Prometheus text format by /metrics
+start_monotonic = time.monotonic()
+registry = Registry()
+registry.counter("inference_requests_total", "Inputs run through the model").set_function(lambda: inference_count)
+registry.counter("inference_errors_total", "Failed or timed out inference requests").set_function(lambda: error_count)
+registry.counter("inference_batches_total", "Batches dispatched to the model").set_function(lambda: batch_count)
+registry.counter("inference_log_records_dropped_total", "Log records dropped because the log queue was full").set_function(
+    lambda: sum(handler.dropped for handler in log_queue_handlers))
+registry.gauge("inference_uptime_seconds", "Seconds since the server started").set_function(
+    lambda: time.monotonic() - start_monotonic)
+queue_wait_seconds = registry.histogram(
+    "inference_queue_wait_seconds", "Time from enqueue until the request's batch starts inference",
+    ["priority_class"])
+queue_wait_seconds_by_class = {name: queue_wait_seconds.labels(name) for name in batch_queue.classes}
+batch_formation_seconds = registry.histogram(
+    "inference_batch_formation_seconds", "Time from the oldest request's enqueue until its batch was dispatched")
+inference_seconds = registry.histogram(
+    "inference_model_seconds", "Model inference time per batch")
+request_seconds = registry.histogram(
+    "inference_request_duration_seconds", "End-to-end /infer latency", ["priority_class", "cached"])
+# (uncached, cached) children per priority class
+request_seconds_by_class = {
+    name: (request_seconds.labels(name, "false"), request_seconds.labels(name, "true"))
+    for name in batch_queue.classes
+}
+time_to_first_token_seconds = registry.histogram(
+    "inference_time_to_first_token_seconds", "Time from request until the first streamed output chunk")
+decode_step_seconds = registry.histogram(
+    "inference_decode_step_seconds", "Duration of one continuous-batching decode step")
+registry.gauge("inference_running_sequences", "Sequences in continuously batched running batches").set_function(
+    lambda: sum(len(scheduler.running) for scheduler in schedulers))
+registry.gauge("inference_kv_tokens_in_use", "KV-cache tokens reserved by running sequences").set_function(
+    lambda: kv_budget.in_use)
+batch_size_histogram = registry.histogram(
+    "inference_batch_size", "Requests per dispatched batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512))
+padding_histogram = registry.histogram(
+    "inference_batch_padding_efficiency", "Real input fraction of each padded batch",
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0))
+registry.gauge("inference_queue_depth", "Requests waiting in the batch queue").set_function(lambda: len(batch_queue))
+registry.gauge("inference_queue_bucket_depth", "Requests waiting per length bucket", ["bucket"]).set_function(
+    lambda: {(label,): depth for label, depth in zip(bucket_labels, batch_queue.bucket_depths())})
+registry.gauge("inference_queue_class_depth", "Requests waiting per priority class", ["priority_class"]).set_function(
+    lambda: {(name,): depth for name, depth in batch_queue.class_depths().items()})
+worker_busy_seconds = registry.counter(
+    "inference_worker_busy_seconds_total", "Seconds each batch worker spent running batches "
+    "(utilization is the rate of this counter)", ["worker"])
+bulk_request_seconds = registry.histogram(
+    "inference_bulk_request_duration_seconds", "End-to-end /infer_batch latency")
+bulk_rows = registry.counter("inference_bulk_rows_total", "Inputs submitted through /infer_batch")
+registry.counter("inference_requests_dropped_total", "Requests dropped because their caller was gone "
+                 "or their deadline had passed", ["stage", "reason"]).set_function(lambda: {
+                     ("queued", "cancelled"): batch_queue.dropped_cancelled,
+                     ("queued", "expired"): batch_queue.dropped_expired,
+                     ("running", "abandoned"): stopped_stream_rows + sum(
+                         scheduler.dropped_running for scheduler in schedulers),
+                 })
+registry.counter("inference_wasted_rows_total", "Rows inferred to completion after their caller had gone").set_function(
+    lambda: wasted_rows + sum(scheduler.wasted_rows for scheduler in schedulers))
+registry.counter("inference_requests_rejected_total", "Requests shed by admission control before queueing",
+                 ["reason"]).set_function(lambda: {
+                     ("queue_full",): admission.rejected_queue_full,
+                     ("predicted_wait",): admission.rejected_predicted_wait,
+                 })
+registry.gauge("inference_admission_throughput_rows_per_second",
+               "Model throughput admission control predicts queue waits from").set_function(
+    lambda: admission.throughput() or 0.0)
+registry.gauge("inference_effective_batch_size", "Batch size currently used by the workers").set_function(
+    lambda: batch_controller.batch_size)
+registry.gauge("inference_effective_batch_timeout_seconds", "Batch wait window currently used by the workers").set_function(
+    lambda: batch_controller.batch_timeout)
+if response_cache is not None:
+    for stat, documentation in (
+            ("hits", "Requests answered from the response cache"),
+            ("misses", "Requests that had to be queued for inference"),
+            ("coalesced", "Requests that joined an identical in-flight request"),
+            ("evictions", "Entries evicted to stay within the cache bounds"),
+            ("expirations", "Entries dropped after their TTL")):
+        registry.counter(f"inference_cache_{stat}_total", documentation).set_function(
+            lambda stat=stat: getattr(response_cache, stat))
+    registry.gauge("inference_cache_entries", "Entries in the response cache").set_function(
+        lambda: len(response_cache))
+    registry.gauge("inference_cache_bytes", "Approximate size of the response cache").set_function(
+        lambda: response_cache.bytes)
 
-# Performance metrics
-total_batch_processing_time = 0
-total_batches_processed = 0
+kv_budget = KVBudget(KV_CACHE_BUDGET_TOKENS)
+schedulers = []
 
-# Store batch workers
+# Store batch workers and other long-running tasks
 batch_workers = []
+background_tasks = []
 
 async def batch_worker(worker_id):
-    global inference_count, error_count, batch_count, total_batch_processing_time, total_batches_processed
+    global inference_count, error_count, batch_count, wasted_rows
     logger.info(f"Starting batch worker {worker_id}")
+    busy_seconds = worker_busy_seconds.labels(worker_id)
     while True:
         try:
-            await batch_event.wait()
+            # Dispatch as soon as a full batch is queued or the oldest item
+            # has waited out the batch timeout (BATCH_SIZE/BATCH_TIMEOUT unless
+            # the adaptive controller has retuned them)
+            items = await batch_queue.get_batch(batch_controller.batch_size, batch_controller.batch_timeout)
+            queue_depth = len(batch_queue)
+            batch_formation_seconds.observe(time.monotonic() - items[0].enqueued_at)
             # Acquire semaphore to limit concurrent batches
             async with batch_semaphore:
-                # collect up to BATCH_SIZE items or until timeout
-                start_time = time.time()
-                await asyncio.sleep(BATCH_TIMEOUT)
-                items = []
-                while batch_queue and len(items) < BATCH_SIZE:
-                    items.append(batch_queue.pop(0))
-                batch_event.clear()
-
+                # Callers may have given up while the batch waited for a slot
+                items = batch_queue.drop_stale(items)
                 if not items:
                     continue
-
                 batch_count += 1
                 batch_size = len(items)
+                batch_size_histogram.observe(batch_size)
                 
-                # Log batch size for monitoring
-                logger.info(f"Processing batch #{batch_count} of size {batch_size} by worker {worker_id}")
+                logger.debug(f"Processing batch #{batch_count} of size {batch_size} by worker {worker_id}")
 
                 # Extract payloads
-                inputs = [it["payload"].input_text for it in items]
+                inputs = [it.payload.input_text for it in items]
                 
                 # Process batch
-                batch_start = time.time()
+                batch_start = time.monotonic()
+                for it in items:
+                    queue_wait_seconds_by_class[it.priority].observe(batch_start - it.enqueued_at)
+                efficiency = padding_efficiency(items)
+                padding_histogram.observe(efficiency)
+                # A streaming batch whose callers all left stops early; its rows
+                # are counted in stopped_stream_rows instead of as inferred/wasted
+                stopped = False
                 try:
-                    # Simulate actual model inference with optimized batching
-                    # In a real implementation, this would be replaced with actual model inference
-                    results = await process_batch_inference(inputs)
-                    inference_count += len(inputs)
-                    
-                    batch_processing_time = (time.time() - batch_start) * 1000
-                    total_batch_processing_time += batch_processing_time
-                    total_batches_processed += 1
+                    if any(it.stream is not None for it in items):
+                        results, stopped = await process_batch_stream(items, inputs)
+                    else:
+                        results = await process_batch_inference(inputs)
+                    if not stopped:
+                        inference_count += len(inputs)
                     
-                    # Log successful inferences
-                    avg_latency_per_item = batch_processing_time / len(items) if len(items) > 0 else 0
-                    logger.info({
-                        "event": "batch_processed",
-                        "batch_id": batch_count,
-                        "batch_size": batch_size,
-                        "processing_time_ms": batch_processing_time,
-                        "avg_latency_per_item_ms": avg_latency_per_item,
-                        "throughput_items_per_second": len(items) / (batch_processing_time / 1000) if batch_processing_time > 0 else 0
-                    })
+                    batch_elapsed = time.monotonic() - batch_start
+                    inference_seconds.observe(batch_elapsed)
+                    busy_seconds.inc(batch_elapsed)
+                    admission.observe(batch_size, batch_elapsed)
+                    batch_queue.deadline_slack = admission.batch_seconds()
+                    batch_processing_time = batch_elapsed * 1000
+                    queue_wait_ms = (batch_start - items[0].enqueued_at) * 1000
+                    batch_controller.observe_batch(batch_size, batch_processing_time, queue_wait_ms, queue_depth)
                     
+                    # Aggregated into periodic batch_processed_summary records
+                    if batch_events is not None:
+                        batch_events.record(
+                            batch_size=batch_size,
+                            queue_wait_ms=queue_wait_ms,
+                            padding_efficiency=efficiency,
+                            processing_time_ms=batch_processing_time,
+                            latency_per_item_ms=batch_processing_time / batch_size,
+                        )
+
                 except Exception as e:
+                    busy_seconds.inc(time.monotonic() - batch_start)
                     error_count += len(inputs)
                     logger.error(f"Inference error in batch #{batch_count} by worker {worker_id}: {str(e)}")
                     # Propagate error to all items in the batch
                     for it in items:
-                        it["future"].set_exception(e)
+                        if not it.future.done():
+                            it.future.set_exception(e)
+                    close_streams(items)
                     continue
 
                 # Set results for all items in the batch
                 for res, it in zip(results, items):
-                    it["future"].set_result(res)
+                    if not it.future.done():
+                        it.future.set_result(res)
+                    elif not stopped:
+                        wasted_rows += 1
+                close_streams(items)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error in batch worker {worker_id}: {str(e)}")
             # Continue running even if there's an error
 
+async def continuous_worker(worker_id):
+    """Run one continuously batched decode loop (SCHEDULER_MODE=continuous)"""
+    global error_count
+    logger.info(f"Starting continuous batching loop {worker_id}")
+    busy_seconds = worker_busy_seconds.labels(worker_id)
+
+    def on_step(batch_size, step_seconds):
+        global batch_count
+        batch_count += 1
+        batch_size_histogram.observe(batch_size)
+        decode_step_seconds.observe(step_seconds)
+        busy_seconds.inc(step_seconds)
+        admission.observe(0, step_seconds)
+
+    def on_finish(entry, result):
+        global inference_count
+        inference_count += 1
+        admission.observe(1, 0.0)
+
+    scheduler = ContinuousBatchScheduler(batch_queue, model_executor, kv_budget, BATCH_SIZE,
+                                         on_step=on_step, on_finish=on_finish)
+    schedulers.append(scheduler)
+    while True:
+        try:
+            await scheduler.run()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error_count += 1
+            logger.error(f"Error in continuous batching loop {worker_id}: {str(e)}")
+
 async def process_batch_inference(inputs):
     """
-    Process a batch of inputs efficiently.
-    In a real implementation, this would call the actual model.
+    Process a batch of inputs with the configured model backend.
+    The backend runs in a thread or process pool so the event loop stays free.
     """
-    # Simulate optimized batch processing
-    # For demonstration, we're still doing echo but in a more efficient way
-    await asyncio.sleep(0.001 * len(inputs))  # Simulate processing time
-    return [f"echo:{s}" for s in inputs]
+    return await model_executor.predict_batch(inputs)
+
+async def process_batch_stream(items, inputs):
+    """
+    Like process_batch_inference, but forwards output chunks to the streaming
+    requests in the batch as the backend produces them. Returns (results,
+    stopped), stopped being True when every caller left before the end.
+    """
+    global stopped_stream_rows
+
+    def on_chunk(row, chunk):
+        stream = items[row].stream
+        if stream is not None:
+            stream.put_nowait(chunk)
+
+    # Stop generating once every caller in the batch has gone away
+    stop = threading.Event()
+    remaining = len(items)
+
+    def on_done(_):
+        nonlocal remaining
+        remaining -= 1
+        if not remaining:
+            stop.set()
+
+    for it in items:
+        it.future.add_done_callback(on_done)
+    results = await model_executor.stream_batch(inputs, on_chunk, stop)
+    stopped = stop.is_set()
+    if stopped:
+        stopped_stream_rows += len(items)
+    return results, stopped
+
+def close_streams(items):
+    """Signal end of output to the streaming requests in a batch"""
+    for it in items:
+        if it.stream is not None:
+            it.stream.put_nowait(None)
 
 @app.on_event("startup")
 async def startup():
     # Start multiple batch workers for better concurrency
     global batch_workers
-    logger.info(f"Starting model server with {MAX_CONCURRENT_BATCHES} batch workers")
+    logger.info(f"Loading model backend '{MODEL_BACKEND}' in a {INFERENCE_EXECUTOR} pool of {INFERENCE_WORKERS}")
+    await model_executor.start()
+    if SCHEDULER_MODE == "continuous":
+        if not model_executor.supports_decode_steps:
+            raise RuntimeError(f"SCHEDULER_MODE=continuous needs a backend with decode steps and the thread "
+                               f"executor, got '{MODEL_BACKEND}' in a {INFERENCE_EXECUTOR} pool")
+        worker_fn = continuous_worker
+    elif SCHEDULER_MODE == "static":
+        worker_fn = batch_worker
+    else:
+        raise RuntimeError(f"Unknown SCHEDULER_MODE '{SCHEDULER_MODE}'. Use 'static' or 'continuous'")
+    logger.info(f"Starting model server with {MAX_CONCURRENT_BATCHES} {SCHEDULER_MODE} batch workers")
     for i in range(MAX_CONCURRENT_BATCHES):
-        worker = asyncio.create_task(batch_worker(i))
+        worker = asyncio.create_task(worker_fn(i))
         batch_workers.append(worker)
+    if INFERENCE_LOGGING:
+        background_tasks.append(asyncio.create_task(flush_log_summaries()))
     logger.info(f"Model server started with {MAX_CONCURRENT_BATCHES} batch workers")
 
+async def flush_log_summaries():
+    """Emit due summaries even when traffic stops"""
+    while True:
+        await asyncio.sleep(LOG_SUMMARY_INTERVAL)
+        inference_events.flush_if_due()
+        batch_events.flush_if_due()
+
 @app.on_event("shutdown")
 async def shutdown():
     logger.info(f"Server shutting down. Total inferences: {inference_count}, Errors: {error_count}, Batches: {batch_count}")
     # Cancel all batch workers
-    for worker in batch_workers:
+    for worker in batch_workers + background_tasks:
         worker.cancel()
+    model_executor.shutdown()
+    if INFERENCE_LOGGING:
+        inference_events.flush()
+        batch_events.flush()
 
 @app.get("/healthz")
 def health():
     return {"status": "ok"}
 
+def priority_class(req):
+    """The queue's priority class for a request, or 400 if the tag is unknown"""
+    try:
+        return batch_queue.class_name(req.priority)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"unknown priority class '{req.priority}', "
+                                                    f"expected one of {sorted(batch_queue.classes)}")
+
+def request_timeout(req, header_timeout_ms=None):
+    """Seconds this request may take: timeout_ms, else the header, capped at REQUEST_TIMEOUT"""
+    timeout_ms = req.timeout_ms if req.timeout_ms is not None else header_timeout_ms
+    if timeout_ms is None:
+        return REQUEST_TIMEOUT
+    return min(max(timeout_ms, 0.0) / 1000, REQUEST_TIMEOUT)
+
+def admit(priority, timeout, rows=1):
+    """Shed the request (all its rows) with 429/503 and Retry-After if it cannot be served in time"""
+    # Depth and wait as seen by the request's last row: all rows must fit under MAX_QUEUE_DEPTH
+    rejection = admission.check(len(batch_queue) + rows - 1, batch_queue.rows_ahead(priority) + rows - 1, timeout)
+    if rejection is not None:
+        status_code, reason, retry_after = rejection
+        raise HTTPException(status_code=status_code, detail=f"overloaded: {reason}",
+                            headers={"Retry-After": str(retry_after)})
+
+def lookup(text, deadline):
+    """
+    Check the response cache for an input. Returns (cached result, in-flight
+    future of an identical request, cache key); all None without a cache.
+    """
+    if response_cache is None:
+        return None, None, None
+    cache_key = response_cache.key(text)
+    cached = response_cache.get(cache_key)
+    fut = None
+    if cached is None:
+        # Share the future of an identical request that is already queued
+        fut = response_cache.inflight(cache_key)
+        entry = queued_entries.get(fut) if fut is not None else None
+        if entry is not None and entry.deadline < deadline:
+            # Keep the shared entry alive for the longest-waiting caller
+            entry.deadline = deadline
+    return cached, fut, cache_key
+
+def enqueue(payload, priority, deadline, cache_key=None, stream=None):
+    """Queue one input for the batch workers and return its future"""
+    fut = asyncio.get_running_loop().create_future()
+    entry = BatchEntry(payload, fut, model_executor.input_length(payload.input_text),
+                       stream=stream, priority=priority, deadline=deadline)
+    batch_queue.put(entry)
+    if cache_key is not None:
+        response_cache.track(cache_key, fut)
+        queued_entries[fut] = entry
+    return fut
+
 @app.post("/infer", response_model=ResponseOut)
-async def infer(req: RequestIn):
+async def infer(req: RequestIn, x_request_timeout_ms: Optional[float] = Header(None)):
+    global error_count
     start_time = time.time()
-    fut = asyncio.get_event_loop().create_future()
-    entry = {"payload": req, "future": fut}
-    batch_queue.append(entry)
-    batch_event.set()
+    priority = priority_class(req)
+    timeout = request_timeout(req, x_request_timeout_ms)
+    deadline = time.monotonic() + timeout
+    cached, fut, cache_key = lookup(req.input_text, deadline)
+    if cached is None and fut is None:
+        admit(priority, timeout)
+        fut = enqueue(req, priority, deadline, cache_key)
     try:
-        result = await asyncio.wait_for(fut, timeout=10.0)
+        if cached is not None:
+            result = cached
+        elif response_cache is not None:
+            # Shielded so one caller timing out does not fail the others
+            result = await asyncio.wait_for(asyncio.shield(fut), timeout=timeout)
+        else:
+            result = await asyncio.wait_for(fut, timeout=timeout)
+        if cached is None and time.monotonic() > deadline:
+            # Ready in time but resumed late on a busy event loop: the caller has given up
+            raise asyncio.TimeoutError()
         latency_ms = (time.time() - start_time) * 1000
+        request_seconds_by_class[priority][cached is not None].observe(latency_ms / 1000)
         
-        # Log inference for monitoring
-        logger.info(json.dumps({
-            "event": "model_inference",
-            "input_text_length": len(req.input_text),
-            "latency_ms": latency_ms,
-            "timestamp": time.time()
-        }))
+        # Aggregated into periodic model_inference_summary records
+        if inference_events is not None:
+            inference_events.record(
+                input_text_length=len(req.input_text),
+                cached=int(cached is not None),
+                latency_ms=latency_ms,
+            )
         
         return ResponseOut(result=result, latency_ms=latency_ms)
     except asyncio.TimeoutError:
@@ -168,17 +576,225 @@ async def infer(req: RequestIn):
         logger.error(f"Inference failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"inference failed: {str(e)}")
 
+def parse_bulk(body, content_type, priority):
+    """
+    Parse an /infer_batch body: a JSON object with "inputs", a bare JSON list
+    of strings, or NDJSON with one string or {"input_text": ...} per line
+    """
+    try:
+        if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+            inputs = []
+            for line in body.splitlines():
+                if line.strip():
+                    item = json.loads(line)
+                    inputs.append(item if isinstance(item, str) else item["input_text"])
+            return BatchRequestIn.model_validate({"inputs": inputs, "priority": priority})
+        data = json.loads(body)
+        if isinstance(data, list):
+            data = {"inputs": data, "priority": priority}
+        elif priority is not None:
+            data.setdefault("priority", priority)
+        return BatchRequestIn.model_validate(data)
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise HTTPException(status_code=422, detail=f"invalid /infer_batch body: {str(e)}")
+
+@app.post("/infer_batch", response_model=BatchResponseOut)
+async def infer_batch(request: Request, stream: bool = False, priority: Optional[str] = None,
+                      x_request_timeout_ms: Optional[float] = Header(None)):
+    """
+    Run many inputs from one HTTP request. Inputs go straight into the batch
+    queue as plain rows (no per-row Pydantic model or HTTP round trip) and
+    share batches with /infer. Results come back in input order, either as
+    one JSON document or, with ?stream=true or an NDJSON Accept header, as
+    NDJSON lines {"index", "result"} (or {"index", "error"}) as each row
+    completes in order. ?priority= sets the class for NDJSON and list bodies.
+    """
+    global error_count
+    start_time = time.time()
+    req = parse_bulk(await request.body(), request.headers.get("content-type", ""), priority)
+    if len(req.inputs) > MAX_BULK_INPUTS:
+        raise HTTPException(status_code=413, detail=f"{len(req.inputs)} inputs, at most {MAX_BULK_INPUTS} per request")
+    priority = priority_class(req)
+    timeout = request_timeout(req, x_request_timeout_ms)
+    deadline = time.monotonic() + timeout
+
+    # Cache hits and in-flight duplicates first, so only real misses count for admission;
+    # repeated texts within the request are one miss, queued once under their cache key
+    rows = [lookup(text, deadline) for text in req.inputs]
+    new = [cache_key for cached, fut, cache_key in rows if cached is None and fut is None]
+    misses = len({key for key in new if key is not None}) + new.count(None)
+    if misses:
+        admit(priority, timeout, misses)
+    waits = []
+    owned = []
+    queued = {}
+    for text, (cached, fut, cache_key) in zip(req.inputs, rows):
+        if cached is not None:
+            waits.append(cached)
+            continue
+        if fut is None:
+            fut = queued.get(cache_key)
+            if fut is None:
+                fut = enqueue(BulkInput(text), priority, deadline, cache_key)
+                owned.append(fut)
+                if cache_key is not None:
+                    queued[cache_key] = fut
+        waits.append(fut)
+    bulk_rows.inc(len(req.inputs))
+
+    if stream or "application/x-ndjson" in request.headers.get("accept", ""):
+        return StreamingResponse(bulk_lines(waits, owned, deadline, start_time), media_type="application/x-ndjson")
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*(_resolved(w) for w in waits)), timeout=timeout)
+    except asyncio.TimeoutError:
+        error_count += 1
+        logger.error(f"Bulk inference timeout ({len(waits)} inputs)")
+        raise HTTPException(status_code=504, detail="inference timeout")
+    except Exception as e:
+        error_count += 1
+        logger.error(f"Bulk inference failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"inference failed: {str(e)}")
+    finally:
+        release_rows(owned)
+    latency_ms = (time.time() - start_time) * 1000
+    bulk_request_seconds.observe(latency_ms / 1000)
+    return BatchResponseOut(results=results, latency_ms=latency_ms)
+
+async def _resolved(wait):
+    """A row's result: cached values as is, futures awaited"""
+    if not asyncio.isfuture(wait):
+        return wait
+    # Shared futures are shielded so this request timing out does not fail the others
+    return await (asyncio.shield(wait) if response_cache is not None else wait)
+
+def release_rows(futures):
+    """
+    Cancel row futures nobody else can be waiting on, so their queued rows
+    are dropped, and mark failed ones as seen
+    """
+    for fut in futures:
+        if not fut.done():
+            if response_cache is None:
+                fut.cancel()
+        elif not fut.cancelled():
+            # Rows that expired after the response gave up; asyncio would warn about them
+            fut.exception()
+
+async def bulk_lines(waits, owned, deadline, start_time):
+    global error_count
+    try:
+        lines = []
+        for index, wait in enumerate(waits):
+            if lines and asyncio.isfuture(wait) and not wait.done():
+                # Send what is ready before blocking on the next row
+                yield "".join(lines)
+                lines = []
+            try:
+                if not asyncio.isfuture(wait):
+                    result = wait
+                elif wait.done():
+                    result = wait.result()
+                else:
+                    result = await asyncio.wait_for(_resolved(wait), timeout=max(deadline - time.monotonic(), 0))
+                line = {"index": index, "result": result}
+            except asyncio.TimeoutError:
+                error_count += 1
+                line = {"index": index, "error": "inference timeout"}
+            except Exception as e:
+                error_count += 1
+                logger.error(f"Bulk inference failed for row {index}: {str(e)}")
+                line = {"index": index, "error": f"inference failed: {str(e)}"}
+            lines.append(json.dumps(line) + "\n")
+        if lines:
+            yield "".join(lines)
+        bulk_request_seconds.observe(time.time() - start_time)
+    finally:
+        # The client may have gone away mid-stream
+        release_rows(owned)
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@app.post("/infer/stream")
+async def infer_stream(req: RequestIn, x_request_timeout_ms: Optional[float] = Header(None)):
+    """
+    Streaming variant of /infer. Output chunks are sent as Server-Sent Events
+    as the backend produces them, followed by a "done" event carrying the full
+    result, latency_ms and ttft_ms. Requests share batches with /infer and go
+    through the response cache: a cached result, or that of an identical
+    request already in flight, is sent as a single chunk.
+    """
+    start_time = time.time()
+    priority = priority_class(req)
+    timeout = request_timeout(req, x_request_timeout_ms)
+    deadline = time.monotonic() + timeout
+    cached, fut, cache_key = lookup(req.input_text, deadline)
+    stream = None
+    if cached is None and fut is None:
+        admit(priority, timeout)
+        stream = asyncio.Queue()
+        fut = enqueue(req, priority, deadline, cache_key, stream=stream)
+    return StreamingResponse(
+        stream_events(req, priority, timeout, fut, stream, cached, start_time),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def stream_events(req, priority, timeout, fut, stream, cached, start_time):
+    global error_count
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    ttft_ms = None
+    try:
+        if cached is not None:
+            ttft_ms = (time.time() - start_time) * 1000
+            yield sse_event({"token": cached})
+            result = cached
+        elif stream is None:
+            # Coalesced onto an identical request: its chunks go to that caller
+            result = await asyncio.wait_for(asyncio.shield(fut), timeout=deadline - loop.time())
+            ttft_ms = (time.time() - start_time) * 1000
+            time_to_first_token_seconds.observe(ttft_ms / 1000)
+            yield sse_event({"token": result})
+        else:
+            while True:
+                chunk = await asyncio.wait_for(stream.get(), timeout=deadline - loop.time())
+                if chunk is None:
+                    break
+                if ttft_ms is None:
+                    ttft_ms = (time.time() - start_time) * 1000
+                    time_to_first_token_seconds.observe(ttft_ms / 1000)
+                yield sse_event({"token": chunk})
+            result = fut.result()
+        latency_ms = (time.time() - start_time) * 1000
+        request_seconds_by_class[priority][cached is not None].observe(latency_ms / 1000)
+        if inference_events is not None:
+            inference_events.record(
+                input_text_length=len(req.input_text),
+                cached=int(cached is not None),
+                latency_ms=latency_ms,
+                ttft_ms=ttft_ms if ttft_ms is not None else latency_ms,
+            )
+        yield sse_event({"result": result, "latency_ms": latency_ms, "ttft_ms": ttft_ms}, event="done")
+    except asyncio.TimeoutError:
+        error_count += 1
+        logger.error("Streaming inference timeout")
+        yield sse_event({"detail": "inference timeout"}, event="error")
+    except Exception as e:
+        error_count += 1
+        logger.error(f"Streaming inference failed: {str(e)}")
+        yield sse_event({"detail": f"inference failed: {str(e)}"}, event="error")
+    finally:
+        # The client may have gone away; let the worker skip this future unless others share it
+        if fut is not None and not fut.done() and response_cache is None:
+            fut.cancel()
+
 @app.get("/metrics")
 async def metrics():
-    """Expose metrics for monitoring"""
-    avg_batch_processing_time = total_batch_processing_time / total_batches_processed if total_batches_processed > 0 else 0
-    return {
-        "inference_count": inference_count,
-        "error_count": error_count,
-        "batch_count": batch_count,
-        "avg_batch_processing_time_ms": avg_batch_processing_time,
-        "uptime": time.time()
-    }
+    """Expose metrics for monitoring in Prometheus text format"""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
 
 @app.get("/config")
 async def get_config():
@@ -186,5 +802,23 @@ async def get_config():
     return {
         "batch_size": BATCH_SIZE,
         "batch_timeout": BATCH_TIMEOUT,
-        "max_concurrent_batches": MAX_CONCURRENT_BATCHES
+        "max_concurrent_batches": MAX_CONCURRENT_BATCHES,
+        "model_backend": MODEL_BACKEND,
+        "scheduler_mode": SCHEDULER_MODE,
+        "kv_cache_budget_tokens": KV_CACHE_BUDGET_TOKENS,
+        "inference_executor": INFERENCE_EXECUTOR,
+        "inference_workers": INFERENCE_WORKERS,
+        "length_buckets": LENGTH_BUCKETS,
+        "max_bucket_wait": MAX_BUCKET_WAIT,
+        "priority_classes": {
+            c.name: {"weight": c.weight, "batch_size": c.batch_size, "batch_timeout": c.batch_timeout}
+            for c in PRIORITY_CLASSES
+        },
+        "default_priority_class": DEFAULT_PRIORITY_CLASS,
+        "request_timeout": REQUEST_TIMEOUT,
+        "admission_control": admission.snapshot(),
+        "response_cache_size": RESPONSE_CACHE_SIZE,
+        "response_cache_ttl": RESPONSE_CACHE_TTL,
+        "response_cache_max_bytes": RESPONSE_CACHE_MAX_BYTES,
+        "adaptive_batching": batch_controller.snapshot()
     }
\ No newline at end of file
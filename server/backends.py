@@ -0,0 +1,312 @@
+"""
+Model backends for the inference server.
+
+A backend takes a whole batch of input strings and returns one result string
+per input. BackendExecutor runs it in a thread or process pool so CPU-bound
+inference never blocks the event loop that serves /infer and /healthz. The
+batch is submitted as a single list, so a process pool pickles it once per
+batch rather than once per item.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class ModelBackend:
+    """Interface for batched model backends"""
+
+    name = "base"
+    has_tokenizer = False
+    # Backends with supports_decode_steps implement start_sequences/decode_step
+    # and can run under the continuous batching scheduler
+    supports_decode_steps = False
+
+    def load(self):
+        """Load weights; called once per process before the first batch"""
+
+    def predict_batch(self, inputs):
+        """Run inference on a list of strings and return a list of strings"""
+        raise NotImplementedError
+
+    def count_tokens(self, text):
+        """Token count of one input, for backends with has_tokenizer set"""
+        raise NotImplementedError
+
+    def stream_batch(self, inputs):
+        """
+        Run inference on a batch, yielding (row, chunk) pairs as output is produced.
+        Concatenating a row's chunks gives its predict_batch result. Backends that
+        cannot stream emit each row's full result as a single chunk.
+        """
+        for row, result in enumerate(self.predict_batch(inputs)):
+            yield row, result
+
+    def start_sequences(self, inputs):
+        """Prefill new sequences and return one opaque decode state per input"""
+        raise NotImplementedError
+
+    def decode_step(self, states):
+        """Advance every state by one token; returns a (chunk, finished) pair per state"""
+        raise NotImplementedError
+
+    def kv_tokens(self, text):
+        """Upper bound on KV-cache tokens a sequence for this input can occupy"""
+        raise NotImplementedError
+
+
+class EchoBackend(ModelBackend):
+    """Stand-in backend that echoes inputs after a simulated compute delay"""
+
+    name = "echo"
+
+    def __init__(self, per_item_latency=0.001):
+        self.per_item_latency = per_item_latency
+
+    def predict_batch(self, inputs):
+        time.sleep(self.per_item_latency * len(inputs))
+        return [f"echo:{s}" for s in inputs]
+
+    def stream_batch(self, inputs):
+        # One whitespace-delimited token per row per decode step, with the
+        # batch's simulated compute time spread evenly over the steps
+        tokens = [f"echo:{s}".split(" ") for s in inputs]
+        steps = max(len(t) for t in tokens)
+        step_latency = self.per_item_latency * len(inputs) / steps
+        for step in range(steps):
+            time.sleep(step_latency)
+            for row, row_tokens in enumerate(tokens):
+                if step < len(row_tokens):
+                    yield row, row_tokens[step] if step == 0 else " " + row_tokens[step]
+
+
+class MockGenerationBackend(ModelBackend):
+    """
+    CPU stand-in for an autoregressive model with realistic batching costs.
+
+    Prefill costs prefill_latency_per_token per input character. Every decode
+    step costs step_latency plus step_latency_per_sequence per running
+    sequence, so batching more sequences per step amortises the fixed cost.
+    Each input deterministically generates between 1 and max_new_tokens tokens.
+    """
+
+    name = "mock-generate"
+    supports_decode_steps = True
+
+    def __init__(self, max_new_tokens=64, step_latency=0.005, step_latency_per_sequence=0.0002,
+                 prefill_latency_per_token=0.00001):
+        self.max_new_tokens = max_new_tokens
+        self.step_latency = step_latency
+        self.step_latency_per_sequence = step_latency_per_sequence
+        self.prefill_latency_per_token = prefill_latency_per_token
+
+    def output_length(self, text):
+        return 1 + zlib.crc32(text.encode("utf-8")) % self.max_new_tokens
+
+    def kv_tokens(self, text):
+        return len(text) + self.max_new_tokens
+
+    def start_sequences(self, inputs):
+        time.sleep(self.prefill_latency_per_token * sum(len(text) for text in inputs))
+        return [{"remaining": self.output_length(text), "generated": 0} for text in inputs]
+
+    def decode_step(self, states):
+        time.sleep(self.step_latency + self.step_latency_per_sequence * len(states))
+        outputs = []
+        for state in states:
+            chunk = f"tok{state['generated']}" if state["generated"] == 0 else f" tok{state['generated']}"
+            state["generated"] += 1
+            state["remaining"] -= 1
+            outputs.append((chunk, state["remaining"] <= 0))
+        return outputs
+
+    def stream_batch(self, inputs):
+        # Static batching: the whole batch steps until its longest sequence is done
+        states = self.start_sequences(inputs)
+        active = list(range(len(states)))
+        while active:
+            outputs = self.decode_step([states[row] for row in active])
+            still_active = []
+            for row, (chunk, finished) in zip(active, outputs):
+                yield row, chunk
+                if not finished:
+                    still_active.append(row)
+            active = still_active
+
+    def predict_batch(self, inputs):
+        results = [""] * len(inputs)
+        for row, chunk in self.stream_batch(inputs):
+            results[row] += chunk
+        return results
+
+
+class TransformersPipelineBackend(ModelBackend):
+    """Hugging Face pipeline backend (e.g. the distilbert model used in models/app.py)"""
+
+    name = "transformers"
+    has_tokenizer = True
+
+    def __init__(self, model_name="distilbert-base-uncased-finetuned-sst-2-english",
+                 task="sentiment-analysis", device=-1):
+        self.model_name = model_name
+        self.task = task
+        self.device = device
+        self._model = None
+        self._tokenizer = None
+        self._local = threading.local()
+
+    def load(self):
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self._model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        self._model.eval()
+
+    def _pipeline(self):
+        # Fast tokenizers are not safe to share between threads, so each
+        # executor thread gets its own tokenizer around the shared model
+        pipe = getattr(self._local, "pipeline", None)
+        if pipe is None:
+            from transformers import pipeline
+
+            pipe = pipeline(self.task, model=self._model,
+                            tokenizer=copy.deepcopy(self._tokenizer), device=self.device)
+            self._local.pipeline = pipe
+        return pipe
+
+    def count_tokens(self, text):
+        # Called on the event loop thread; executor threads use their own copies
+        return len(self._tokenizer(text, truncation=True)["input_ids"])
+
+    def predict_batch(self, inputs):
+        outputs = self._pipeline()(inputs, batch_size=len(inputs), truncation=True)
+        return [f"{out['label']}:{out['score']:.4f}" for out in outputs]
+
+
+BACKENDS = {
+    EchoBackend.name: EchoBackend,
+    MockGenerationBackend.name: MockGenerationBackend,
+    TransformersPipelineBackend.name: TransformersPipelineBackend,
+}
+
+
+def create_backend(name, **kwargs):
+    """Instantiate a registered backend by name"""
+    try:
+        backend_cls = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown model backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+    return backend_cls(**kwargs)
+
+
+# Each process-pool worker loads its own copy of the backend
+_process_backend = None
+
+
+def _init_process_backend(name, kwargs):
+    global _process_backend
+    _process_backend = create_backend(name, **kwargs)
+    _process_backend.load()
+
+
+def _run_stream(backend, inputs, loop, on_chunk, stop=None):
+    results = [""] * len(inputs)
+    for row, chunk in backend.stream_batch(inputs):
+        results[row] += chunk
+        loop.call_soon_threadsafe(on_chunk, row, chunk)
+        if stop is not None and stop.is_set():
+            # Every caller in the batch is gone; stop generating
+            break
+    return results
+
+
+def _predict_in_process(inputs):
+    if not inputs:
+        return []
+    return _process_backend.predict_batch(inputs)
+
+
+class BackendExecutor:
+    """Runs a backend's predict_batch in a thread or process pool"""
+
+    def __init__(self, backend_name, backend_kwargs=None, executor="thread", workers=4):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown inference executor '{executor}'. Use 'thread' or 'process'")
+        self.backend_name = backend_name
+        self.backend_kwargs = backend_kwargs or {}
+        self.executor = executor
+        self.workers = workers
+        self.backend = None
+        self._pool = None
+        # Token counts need the tokenizer in this process, i.e. a thread pool
+        self.counts_tokens = executor == "thread" and BACKENDS[backend_name].has_tokenizer
+
+    async def start(self):
+        """Create the pool and load the model without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        if self.executor == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_process_backend,
+                initargs=(self.backend_name, self.backend_kwargs),
+            )
+            # Warm the pool so the model is loaded before traffic arrives
+            await asyncio.gather(*(
+                loop.run_in_executor(self._pool, _predict_in_process, [])
+                for _ in range(self.workers)
+            ))
+        else:
+            self.backend = create_backend(self.backend_name, **self.backend_kwargs)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+            await loop.run_in_executor(self._pool, self.backend.load)
+
+    def input_length(self, text):
+        """Length used for batch bucketing: tokens when available, else characters"""
+        if self.counts_tokens and self.backend is not None:
+            return self.backend.count_tokens(text)
+        return len(text)
+
+    async def predict_batch(self, inputs):
+        loop = asyncio.get_running_loop()
+        if self.executor == "process":
+            return await loop.run_in_executor(self._pool, _predict_in_process, inputs)
+        return await loop.run_in_executor(self._pool, self.backend.predict_batch, inputs)
+
+    async def stream_batch(self, inputs, on_chunk, stop=None):
+        """
+        Run a batch, calling on_chunk(row, chunk) on the event loop as output arrives.
+        Returns the full results. Process pools cannot hand chunks back as they are
+        produced, so there each row arrives as one chunk when the batch finishes.
+        Setting the threading.Event stop ends generation early (thread pools only).
+        """
+        if self.executor == "process":
+            results = await self.predict_batch(inputs)
+            for row, result in enumerate(results):
+                on_chunk(row, result)
+            return results
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _run_stream, self.backend, inputs, loop, on_chunk, stop)
+
+    @property
+    def supports_decode_steps(self):
+        # Decode states live in this process, so stepping needs a thread pool
+        return self.executor == "thread" and BACKENDS[self.backend_name].supports_decode_steps
+
+    async def start_sequences(self, inputs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.backend.start_sequences, inputs)
+
+    async def decode_step(self, states):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.backend.decode_step, states)
+
+    def kv_tokens(self, text):
+        return self.backend.kv_tokens(text)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
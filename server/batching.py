@@ -0,0 +1,352 @@
+"""
+Batching engine used by the inference server.
+
+Requests are appended to deques and handed to batch workers in FIFO order.
+Enqueue and dequeue are O(1), and idle workers wait on their own futures so a
+put always wakes exactly one consumer instead of racing on a shared event.
+
+A batch is dispatched as soon as it is full or the oldest queued entry has
+waited for the batch timeout, so no request pays the timeout for nothing.
+
+Entries are bucketed by input length (characters, or tokens when the backend
+has a tokenizer) so a batch only pads up to similar lengths. Full buckets are
+served first; a bucket whose oldest entry has waited max_bucket_wait seconds
+jumps ahead of full buckets so long inputs are never starved. A batch that
+leaves before it is full is topped up from shorter buckets, which adds rows
+without raising the padded length.
+
+Each entry also belongs to a priority class (an interactive tier, a bulk
+backfill tenant, ...) with its own buckets. Classes that have a batch ready
+are served by weighted fair queuing: every class keeps a virtual finish time
+that advances by rows served / weight, and the ready class with the earliest
+virtual start time goes next. A backlogged class therefore gets its weighted
+share of rows and can never starve the others. Classes may override the batch
+size and timeout passed in by the workers.
+
+Entries whose caller has gone away (future already done) or whose deadline
+is less than deadline_slack seconds away (too late to finish a batch in time)
+are dropped as they reach the head of a bucket or are popped, so they never
+take a row in a batch.
+"""
+
+import asyncio
+import bisect
+import time
+from collections import deque
+
+
+class BatchEntry:
+    """A single queued request waiting for a batch worker"""
+
+    __slots__ = ("payload", "future", "enqueued_at", "length", "stream", "priority", "deadline")
+
+    def __init__(self, payload, future, length=0, stream=None, priority=None, deadline=None):
+        self.payload = payload
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        # time.monotonic() after which the caller no longer wants the result
+        self.deadline = deadline
+        self.length = length
+        # asyncio.Queue receiving output chunks for streaming requests, then None
+        self.stream = stream
+        # Priority class name; None means the queue's default class
+        self.priority = priority
+
+
+class PriorityClass:
+    """Scheduling settings for one priority class"""
+
+    __slots__ = ("name", "weight", "batch_size", "batch_timeout")
+
+    def __init__(self, name, weight=1.0, batch_size=None, batch_timeout=None):
+        if weight <= 0:
+            raise ValueError(f"priority class '{name}' needs a positive weight, got {weight}")
+        self.name = name
+        self.weight = weight
+        # None falls back to the batch size/timeout the worker asks for
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+
+
+def parse_priority_classes(spec):
+    """
+    Parse "name:weight[:batch_size[:batch_timeout]],..." into PriorityClass
+    objects, e.g. "interactive:8:8:0.002,backfill:1:128:0.05". Empty fields
+    keep the worker defaults ("backfill:1::0.05").
+    """
+    classes = []
+    for item in spec.split(","):
+        fields = [field.strip() for field in item.split(":")]
+        if not fields[0]:
+            continue
+        if len(fields) > 4:
+            raise ValueError(f"invalid priority class '{item}', expected name:weight[:batch_size[:batch_timeout]]")
+        fields += [""] * (4 - len(fields))
+        name, weight, batch_size, batch_timeout = fields
+        classes.append(PriorityClass(
+            name,
+            float(weight) if weight else 1.0,
+            int(batch_size) if batch_size else None,
+            float(batch_timeout) if batch_timeout else None,
+        ))
+    return classes
+
+
+def padding_efficiency(items):
+    """Fraction of a padded batch that is real input (1.0 means no padding)"""
+    longest = max((it.length for it in items), default=0)
+    if longest == 0:
+        return 1.0
+    return sum(it.length for it in items) / (longest * len(items))
+
+
+class BatchQueue:
+    """Length-bucketed, priority-class-aware request queue with O(1) enqueue/dequeue and multi-consumer wakeups"""
+
+    def __init__(self, bucket_bounds=None, max_bucket_wait=None, classes=None, default_class=None):
+        # bucket i holds lengths <= bucket_bounds[i]; the last bucket is unbounded
+        self.bucket_bounds = sorted(bucket_bounds or [])
+        self.max_bucket_wait = max_bucket_wait
+        self.classes = {c.name: c for c in classes or [PriorityClass("default")]}
+        self.default_class = default_class or next(iter(self.classes))
+        if self.default_class not in self.classes:
+            raise ValueError(f"default priority class '{self.default_class}' is not configured")
+        self._buckets = {name: [deque() for _ in range(len(self.bucket_bounds) + 1)] for name in self.classes}
+        self._class_sizes = dict.fromkeys(self.classes, 0)
+        # Weighted fair queuing state: per-class virtual finish time and the
+        # virtual time of the most recently dispatched batch
+        self._finish_tags = dict.fromkeys(self.classes, 0.0)
+        self._virtual_time = 0.0
+        self._size = 0
+        self._getters = deque()
+
+        # Entries this close to their deadline cannot finish in time; the
+        # server keeps it at the recent batch processing time
+        self.deadline_slack = 0.0
+        self.dropped_cancelled = 0
+        self.dropped_expired = 0
+
+    def __len__(self):
+        return self._size
+
+    def bucket_depths(self):
+        return [sum(len(buckets[i]) for buckets in self._buckets.values()) for i in range(len(self.bucket_bounds) + 1)]
+
+    def class_depths(self):
+        return dict(self._class_sizes)
+
+    def rows_ahead(self, name):
+        """
+        Rows expected to be served before a new entry of class name: its own
+        backlog scaled by the share fair queuing gives the other backlogged
+        classes, capped at the whole queue
+        """
+        weights = sum(self.classes[other].weight for other, size in self._class_sizes.items()
+                      if size or other == name)
+        return min(self._size, self._class_sizes[name] * weights / self.classes[name].weight)
+
+    def class_name(self, priority):
+        """Resolve a request's priority tag to a configured class name"""
+        if priority is None:
+            return self.default_class
+        if priority not in self.classes:
+            raise KeyError(priority)
+        return priority
+
+    def put(self, entry):
+        """Enqueue an entry and wake one waiting worker"""
+        name = entry.priority = self.class_name(entry.priority)
+        if not self._class_sizes[name]:
+            # A newly backlogged class gets no credit for the time it sat idle
+            self._finish_tags[name] = max(self._finish_tags[name], self._virtual_time)
+        self._buckets[name][bisect.bisect_left(self.bucket_bounds, entry.length)].append(entry)
+        self._class_sizes[name] += 1
+        self._size += 1
+        self._wakeup_next()
+
+    def _wakeup_next(self):
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
+
+    async def _wait_for_put(self, timeout=None):
+        loop = asyncio.get_running_loop()
+        getter = loop.create_future()
+        self._getters.append(getter)
+        timer = None
+        if timeout is not None:
+            timer = loop.call_later(timeout, _wake, getter)
+        try:
+            await getter
+        except asyncio.CancelledError:
+            # Pass a wakeup we may have consumed on to another worker
+            if getter.done() and self._size:
+                self._wakeup_next()
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if not getter.done():
+                getter.cancel()
+
+    def _oldest_bucket(self, buckets):
+        oldest = None
+        for index, bucket in enumerate(buckets):
+            if bucket and (oldest is None or bucket[0].enqueued_at < buckets[oldest][0].enqueued_at):
+                oldest = index
+        return oldest
+
+    def _full_bucket(self, buckets, max_size):
+        full = None
+        for index, bucket in enumerate(buckets):
+            if len(bucket) >= max_size and (full is None or bucket[0].enqueued_at < buckets[full][0].enqueued_at):
+                full = index
+        return full
+
+    def _next_class(self, names):
+        """The class with the earliest virtual start time (ties go to the heavier weight)"""
+        return min(names, key=lambda name: (self._finish_tags[name], -self.classes[name].weight))
+
+    def _drop_if_stale(self, entry, now):
+        """Drop an entry nobody is waiting for any more; True if it was dropped"""
+        if entry.future.done():
+            self.dropped_cancelled += 1
+        elif entry.deadline is not None and now + self.deadline_slack >= entry.deadline:
+            self.dropped_expired += 1
+            entry.future.set_exception(asyncio.TimeoutError())
+        else:
+            return False
+        if entry.stream is not None:
+            entry.stream.put_nowait(None)
+        return True
+
+    def drop_stale(self, items):
+        """Filter popped entries that went stale since, e.g. while waiting for a free worker"""
+        now = time.monotonic()
+        return [entry for entry in items if not self._drop_if_stale(entry, now)]
+
+    def _purge_heads(self, name, now):
+        dropped = 0
+        for bucket in self._buckets[name]:
+            while bucket and self._drop_if_stale(bucket[0], now):
+                bucket.popleft()
+                dropped += 1
+        self._class_sizes[name] -= dropped
+        self._size -= dropped
+
+    def _pop(self, name, index, max_size):
+        buckets = self._buckets[name]
+        now = time.monotonic()
+        batch = []
+        taken = 0
+        # Take from the chosen bucket, then top up from shorter buckets
+        while index >= 0 and len(batch) < max_size:
+            bucket = buckets[index]
+            while bucket and len(batch) < max_size:
+                entry = bucket.popleft()
+                taken += 1
+                if not self._drop_if_stale(entry, now):
+                    batch.append(entry)
+            index -= 1
+        self._class_sizes[name] -= taken
+        self._size -= taken
+        start_tag = self._finish_tags[name]
+        self._virtual_time = start_tag
+        self._finish_tags[name] = start_tag + len(batch) / self.classes[name].weight
+        if self._size:
+            # Leftovers belong to the next idle worker
+            self._wakeup_next()
+        return batch
+
+    def _backlogged(self):
+        return [name for name, size in self._class_sizes.items() if size]
+
+    def _purge_all_heads(self):
+        now = time.monotonic()
+        for name in self._backlogged():
+            self._purge_heads(name, now)
+
+    def requeue(self, entry):
+        """
+        Put an entry popped by get_nowait back at the head of its bucket, e.g.
+        when it could not be started after all, refunding its fair-queuing cost
+        """
+        name = entry.priority
+        self._buckets[name][bisect.bisect_left(self.bucket_bounds, entry.length)].appendleft(entry)
+        self._class_sizes[name] += 1
+        self._size += 1
+        self._finish_tags[name] -= 1 / self.classes[name].weight
+
+    def get_nowait(self, max_size):
+        """
+        Pop up to max_size entries from the next class in fair-queuing order,
+        starting with that class's bucket holding the oldest entry.
+        """
+        self._purge_all_heads()
+        if not self._size:
+            return []
+        name = self._next_class(self._backlogged())
+        return self._pop(name, self._oldest_bucket(self._buckets[name]), max_size)
+
+    async def wait_not_empty(self):
+        """Block until at least one entry is queued"""
+        while not self._size:
+            await self._wait_for_put()
+
+    async def get_batch(self, max_size, timeout):
+        """
+        Wait for a batch and pop it.
+
+        A class has a batch ready as soon as one of its buckets holds its batch
+        size, or once its oldest entry has been waiting for its timeout
+        (max_size/timeout unless the class overrides them). Among the ready
+        classes the one that is next in fair-queuing order is served.
+        """
+        while True:
+            self._purge_all_heads()
+            if not self._size:
+                await self._wait_for_put()
+                continue
+            now = time.monotonic()
+            ready = {}
+            next_deadline = None
+            for name in self._backlogged():
+                pick = self._ready_bucket(name, now, max_size, timeout)
+                if isinstance(pick, tuple):
+                    ready[name] = pick
+                elif next_deadline is None or pick < next_deadline:
+                    next_deadline = pick
+            if ready:
+                name = self._next_class(ready)
+                batch = self._pop(name, *ready[name])
+                if batch:
+                    return batch
+                continue
+            await self._wait_for_put(next_deadline)
+
+    def _ready_bucket(self, name, now, max_size, timeout):
+        """
+        (bucket index, batch size) to serve for a class, or the number of
+        seconds until it will be ready if nothing arrives in the meantime.
+        """
+        priority_class = self.classes[name]
+        batch_size = priority_class.batch_size or max_size
+        batch_timeout = timeout if priority_class.batch_timeout is None else priority_class.batch_timeout
+        buckets = self._buckets[name]
+        oldest = self._oldest_bucket(buckets)
+        waited = now - buckets[oldest][0].enqueued_at
+        if self.max_bucket_wait is not None and waited >= self.max_bucket_wait:
+            return oldest, batch_size
+        full = self._full_bucket(buckets, batch_size)
+        if full is not None:
+            return full, batch_size
+        if waited >= batch_timeout:
+            return oldest, batch_size
+        return batch_timeout - waited
+
+
+def _wake(getter):
+    if not getter.done():
+        getter.set_result(None)
@@ -0,0 +1,102 @@
+"""
+Content-addressed response cache for /infer.
+
+Results are keyed by a SHA-256 of the input text and kept in an LRU with a
+TTL, bounded by entry count and optionally by approximate size in bytes.
+Requests whose input is already being inferred are handed the in-flight
+future instead of being queued again, so identical concurrent prompts cost
+one model row.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+
+# Rough per-entry bookkeeping cost (key, tuple, OrderedDict node)
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class ResponseCache:
+    """LRU + TTL cache with in-flight request coalescing"""
+
+    def __init__(self, max_entries=10000, ttl=300.0, max_bytes=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._inflight = {}
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return a cached value, or None on a miss or expired entry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, size = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.bytes -= size
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        size = len(key) + len(value) + ENTRY_OVERHEAD_BYTES
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old[2]
+        self._entries[key] = (value, time.monotonic() + self.ttl, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self.bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+            self.evictions += 1
+
+    def inflight(self, key):
+        """Return the future of an identical request already being inferred"""
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        return future
+
+    def track(self, key, future):
+        """Share future with identical requests until it resolves, then cache its result"""
+        self.misses += 1
+        self._inflight[key] = future
+        future.add_done_callback(lambda fut: self._resolve(key, fut))
+
+    def _resolve(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is None:
+            self.put(key, future.result())
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "inflight": len(self._inflight),
+        }
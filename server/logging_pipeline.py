@@ -0,0 +1,157 @@
+"""
+Asynchronous, queue-backed logging for the inference server.
+
+setup_logging() applies the logging config (LOGGING_CONFIG_PATH, e.g.
+monitoring/logging-config.yaml) and then moves every configured handler
+behind a QueueHandler. The event loop only appends records to an in-memory
+queue; a QueueListener thread does the formatting and the console, file and
+Cloud Logging I/O.
+
+Per-inference and per-batch events go through EventAggregator, which emits
+one summary record per N events or per interval, optionally alongside a
+random sample of the individual events. Errors are never aggregated or
+sampled and are always logged in full.
+"""
+
+import atexit
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that hands records over untouched and never blocks on INFO noise"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Records stay in-process, so formatting is left to the listener thread
+        return record
+
+    def enqueue(self, record):
+        if record.levelno >= logging.ERROR:
+            # Errors must not be lost, even if that means waiting for space
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _load_config(config_path):
+    import yaml
+
+    with open(config_path, "r") as f:
+        data = yaml.safe_load(f)
+    config = dict(data.get("logging", data))
+    level = config.pop("level", None)
+    config.setdefault("version", 1)
+    config.setdefault("disable_existing_loggers", False)
+    if level is not None:
+        config.setdefault("root", {}).setdefault("level", level)
+    return config
+
+
+def setup_logging(config_path=None, level=logging.INFO, use_queue=True, queue_size=10000):
+    """
+    Configure logging and, with use_queue, move all handlers onto a listener thread.
+    Returns the queue handlers so callers can report dropped records.
+    """
+    configured = False
+    if config_path and os.path.exists(config_path):
+        try:
+            logging.config.dictConfig(_load_config(config_path))
+            configured = True
+        except Exception as e:
+            # e.g. google-cloud-logging is not installed when running locally
+            logging.basicConfig(level=level)
+            logger.error(f"Could not apply logging config {config_path}: {str(e)}")
+    if not configured:
+        logging.basicConfig(level=level)
+
+    if not use_queue:
+        return []
+
+    # One queue and listener per distinct handler set, shared by the loggers using it
+    loggers = [logging.getLogger()] + [
+        lg for lg in logging.Logger.manager.loggerDict.values()
+        if isinstance(lg, logging.Logger) and lg.handlers
+    ]
+    queue_handlers = {}
+    for lg in loggers:
+        handlers = [h for h in lg.handlers if not isinstance(h, logging.handlers.QueueHandler)]
+        if not handlers:
+            continue
+        key = tuple(id(h) for h in handlers)
+        if key not in queue_handlers:
+            log_queue = queue.Queue(maxsize=queue_size)
+            listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            atexit.register(listener.stop)
+            queue_handlers[key] = NonBlockingQueueHandler(log_queue)
+        lg.handlers = [queue_handlers[key]]
+    return list(queue_handlers.values())
+
+
+class EventAggregator:
+    """Collapses high-rate events into periodic summary records"""
+
+    def __init__(self, target_logger, event, every_n=1000, interval=1.0, sample_rate=0.0):
+        self.logger = target_logger
+        self.event = event
+        self.every_n = every_n
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self._reset()
+
+    def _reset(self):
+        self.count = 0
+        self.window_start = time.monotonic()
+        self._sums = {}
+        self._counts = {}
+        self._maxes = {}
+
+    def record(self, **fields):
+        """Accumulate one event's numeric fields; may emit a sample and/or a summary"""
+        if self.sample_rate and random.random() < self.sample_rate:
+            self.logger.info({"event": self.event, "sampled": True, **fields})
+        self.count += 1
+        sums = self._sums
+        counts = self._counts
+        maxes = self._maxes
+        for name, value in fields.items():
+            sums[name] = sums.get(name, 0) + value
+            counts[name] = counts.get(name, 0) + 1
+            if value > maxes.get(name, value - 1):
+                maxes[name] = value
+        if self.count >= self.every_n or time.monotonic() - self.window_start >= self.interval:
+            self.flush()
+
+    def flush(self):
+        """Emit the summary for the current window, if it has any events"""
+        if not self.count:
+            return
+        summary = {
+            "event": f"{self.event}_summary",
+            "count": self.count,
+            "window_seconds": time.monotonic() - self.window_start,
+        }
+        for name, total in self._sums.items():
+            # Fields such as ttft_ms are only on some events: average over those
+            summary[f"avg_{name}"] = total / self._counts[name]
+            summary[f"max_{name}"] = self._maxes[name]
+        self.logger.info(summary)
+        self._reset()
+
+    def flush_if_due(self):
+        if time.monotonic() - self.window_start >= self.interval:
+            self.flush()
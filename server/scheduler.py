@@ -0,0 +1,183 @@
+"""
+Continuous (iteration-level) batching for generation workloads.
+
+With static batching a batch runs until its longest sequence finishes, so
+short generations wait for long ones. Here each running batch is re-formed at
+every decode step: finished sequences leave and their futures resolve
+immediately, and queued requests join as soon as there is a free slot and
+enough KV-cache budget for them.
+
+Every ContinuousBatchScheduler loop owns one running batch of at most
+max_batch_size sequences; the server runs MAX_CONCURRENT_BATCHES loops over
+the same BatchQueue and one shared KVBudget. A sequence reserves its
+worst-case KV footprint (prompt plus max new tokens) when it is admitted, so
+nothing has to be preempted mid-generation. A running sequence whose caller
+has gone away or whose deadline has passed leaves at the next step.
+"""
+
+import asyncio
+import time
+
+
+class KVBudget:
+    """KV-cache token budget shared by every running batch"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.in_use = 0
+        self._waiters = []
+
+    def try_reserve(self, tokens):
+        if self.in_use + tokens > self.capacity:
+            return False
+        self.in_use += tokens
+        return True
+
+    def release(self, tokens):
+        self.in_use -= tokens
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for_release(self):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+
+class _Sequence:
+    __slots__ = ("entry", "state", "kv_tokens", "chunks")
+
+    def __init__(self, entry, state, kv_tokens):
+        self.entry = entry
+        self.state = state
+        self.kv_tokens = kv_tokens
+        self.chunks = []
+
+
+class ContinuousBatchScheduler:
+    """One running batch whose membership changes at every decode step"""
+
+    def __init__(self, queue, executor, kv_budget, max_batch_size, on_step=None, on_finish=None):
+        self.queue = queue
+        self.executor = executor
+        self.kv_budget = kv_budget
+        self.max_batch_size = max_batch_size
+        # on_step(batch_size, step_seconds) and on_finish(entry, result) hooks for metrics
+        self.on_step = on_step
+        self.on_finish = on_finish
+        self.running = []
+        self.blocked_on_kv = False
+        # Sequences dropped mid-generation, and finished ones nobody was waiting for
+        self.dropped_running = 0
+        self.wasted_rows = 0
+
+    def _admit_candidates(self):
+        """Pop queued entries that fit in the free slots and the KV budget"""
+        admitted = []
+        self.blocked_on_kv = False
+        free_slots = self.max_batch_size - len(self.running)
+        while free_slots > len(admitted):
+            # get_nowait() drops entries whose callers gave up while queued
+            popped = self.queue.get_nowait(1)
+            if not popped:
+                break
+            entry = popped[0]
+            tokens = self.executor.kv_tokens(entry.payload.input_text)
+            if tokens > self.kv_budget.capacity:
+                entry.future.set_exception(ValueError(
+                    f"input needs {tokens} KV tokens, over the budget of {self.kv_budget.capacity}"))
+                _close_stream(entry)
+                continue
+            if not self.kv_budget.try_reserve(tokens):
+                # Keep its place in line until running sequences free KV budget
+                self.queue.requeue(entry)
+                self.blocked_on_kv = True
+                break
+            admitted.append((entry, tokens))
+        return admitted
+
+    async def _admit(self):
+        admitted = self._admit_candidates()
+        if not admitted:
+            return
+        try:
+            states = await self.executor.start_sequences([entry.payload.input_text for entry, _ in admitted])
+        except Exception as e:
+            for entry, tokens in admitted:
+                self.kv_budget.release(tokens)
+                if not entry.future.done():
+                    entry.future.set_exception(e)
+                _close_stream(entry)
+            raise
+        for (entry, tokens), state in zip(admitted, states):
+            self.running.append(_Sequence(entry, state, tokens))
+
+    def _finish(self, seq, result=None, error=None):
+        self.kv_budget.release(seq.kv_tokens)
+        entry = seq.entry
+        if not entry.future.done():
+            if error is not None:
+                entry.future.set_exception(error)
+            else:
+                entry.future.set_result(result)
+                if self.on_finish is not None:
+                    self.on_finish(entry, result)
+        elif error is None and result is not None:
+            self.wasted_rows += 1
+        _close_stream(entry)
+
+    async def step(self):
+        """Admit what fits, run one decode step, and retire finished sequences"""
+        # Drop sequences whose callers are gone before spending a step on them
+        now = time.monotonic()
+        for seq in [seq for seq in self.running if _abandoned(seq.entry, now)]:
+            self.running.remove(seq)
+            self.dropped_running += 1
+            self._finish(seq, error=asyncio.TimeoutError())
+        await self._admit()
+        if not self.running:
+            return
+
+        batch = self.running
+        start = time.monotonic()
+        try:
+            outputs = await self.executor.decode_step([seq.state for seq in batch])
+        except Exception as e:
+            self.running = []
+            for seq in batch:
+                self._finish(seq, error=e)
+            raise
+        if self.on_step is not None:
+            self.on_step(len(batch), time.monotonic() - start)
+
+        still_running = []
+        for seq, (chunk, finished) in zip(batch, outputs):
+            seq.chunks.append(chunk)
+            if seq.entry.stream is not None:
+                seq.entry.stream.put_nowait(chunk)
+            if finished:
+                self._finish(seq, "".join(seq.chunks))
+            else:
+                still_running.append(seq)
+        self.running = still_running
+
+    async def run(self):
+        """Step forever, sleeping on the queue while there is nothing to run"""
+        while True:
+            if not self.running:
+                await self.queue.wait_not_empty()
+            await self.step()
+            if not self.running and self.blocked_on_kv:
+                # Queued work does not fit until another batch frees KV budget
+                await self.kv_budget.wait_for_release()
+
+
+def _abandoned(entry, now):
+    return entry.future.done() or (entry.deadline is not None and now >= entry.deadline)
+
+
+def _close_stream(entry):
+    if entry.stream is not None:
+        entry.stream.put_nowait(None)
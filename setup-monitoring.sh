@@ -53,18 +53,29 @@ gcloud logging sinks create deepseek-pubsub-sink \
 
 # Create custom metrics from logs
 echo "Creating custom metrics from logs..."
+# The server logs one model_inference_summary record per LOG_SUMMARY_EVERY
+# inferences or LOG_SUMMARY_INTERVAL seconds, with the number of inferences
+# in "count" and avg_/max_ fields, instead of one record per inference
 gcloud logging metrics create model-inference-latency \
-  --description="Latency metric for model inference" \
-  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="model_inference"' \
+  --description="Average model inference latency per summary window" \
+  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="model_inference_summary"' \
   --metric-descriptor-type=double \
   --metric-descriptor-unit=ms \
-  --value-extractor='EXTRACT(jsonPayload.latency_ms)'
+  --value-extractor='EXTRACT(jsonPayload.avg_latency_ms)'
 
+gcloud logging metrics create model-inference-latency-max \
+  --description="Maximum model inference latency per summary window" \
+  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="model_inference_summary"' \
+  --metric-descriptor-type=double \
+  --metric-descriptor-unit=ms \
+  --value-extractor='EXTRACT(jsonPayload.max_latency_ms)'
+
+# Inferences per summary record; sum the values for the request count
 gcloud logging metrics create model-inference-count \
   --description="Count of model inferences" \
-  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="model_inference"' \
+  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="model_inference_summary"' \
   --metric-descriptor-type=int64 \
-  --value-extractor='1'
+  --value-extractor='EXTRACT(jsonPayload.count)'
 
 gcloud logging metrics create model-inference-errors \
   --description="Count of model inference errors" \
@@ -73,10 +84,10 @@ gcloud logging metrics create model-inference-errors \
   --value-extractor='1'
 
 gcloud logging metrics create model-batch-size \
-  --description="Batch size distribution" \
-  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="inference_success"' \
-  --metric-descriptor-type=int64 \
-  --value-extractor='EXTRACT(jsonPayload.batch_size)'
+  --description="Average batch size per summary window" \
+  --log-filter='resource.type="k8s_container" resource.labels.container_name="server" jsonPayload.event="batch_processed_summary"' \
+  --metric-descriptor-type=double \
+  --value-extractor='EXTRACT(jsonPayload.avg_batch_size)'
 
 echo "Monitoring and logging setup complete!"
 echo "Next steps:"
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Benchmark-driven tuning of performance_profiles.yaml
+
+Sweeps BATCH_SIZE, BATCH_TIMEOUT, MAX_CONCURRENT_BATCHES and the uvicorn
+worker count against a locally launched server/app.py. Each point gets a
+fresh server and the same fixed open-loop load from performance_test.py
+(--rate, --duration, --schedule), preceded by a short warm-up. A point is
+feasible when its p99 latency is within --p99-ms and at least
+--min-success-rate percent of requests succeed; the feasible point with the
+highest goodput (successful requests/second) wins, lower p99 breaking ties.
+
+Set --rate at or above the peak load the deployment has to carry: points
+that keep up all serve about --rate, and the p99 limit separates them.
+
+The winner is written to --profiles-file as profile --profile-name, copying
+the replica, resource and HPA settings of --base-profile, so it can be
+applied with:
+    python apply_performance_profile.py tuned
+
+Usage:
+    python tune_performance_profile.py --rate 300 --p99-ms 250
+    python tune_performance_profile.py --search random --samples 12 --env MODEL_BACKEND=transformers
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from local_server import LocalServer  # noqa: E402
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+TUNED_KEYS = ["batch_size", "batch_timeout", "max_concurrent_batches", "uvicorn_workers"]
+
+
+def search_points(args):
+    """Configurations to benchmark: the full grid, or --samples of it at random"""
+    grid = [dict(zip(TUNED_KEYS, values)) for values in itertools.product(
+        args.batch_sizes, args.batch_timeouts, args.max_concurrent_batches, args.workers)]
+    if args.search == "random" and args.samples < len(grid):
+        grid = random.Random(args.seed).sample(grid, args.samples)
+    return grid
+
+
+def run_load(url, args, duration, output):
+    """Run performance_test.py against url and return its JSON summary"""
+    command = [
+        sys.executable, os.path.join(ROOT_DIR, "performance_test.py"),
+        "--url", url,
+        "--rate", str(args.rate),
+        "--duration", str(duration),
+        "--schedule", args.schedule,
+        "--seed", str(args.seed),
+        "--timeout", str(args.timeout),
+        "--output", output,
+    ]
+    subprocess.run(command, cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL)
+    with open(output, "r") as f:
+        return json.load(f)
+
+
+def benchmark_point(point, args, output):
+    """Launch the server with point's settings, load it, and return the measurements"""
+    env = {
+        **args.env,
+        "BATCH_SIZE": point["batch_size"],
+        "BATCH_TIMEOUT": point["batch_timeout"],
+        "MAX_CONCURRENT_BATCHES": point["max_concurrent_batches"],
+    }
+    with LocalServer(env, workers=point["uvicorn_workers"]) as server:
+        if args.warmup > 0:
+            run_load(server.url, args, args.warmup, output)
+        results = run_load(server.url, args, args.duration, output)
+
+    test_results = results["test_results"]
+    return {
+        **point,
+        "goodput_rps": test_results["successful_requests"] / test_results["total_test_time_seconds"],
+        "success_rate_percent": test_results["success_rate_percent"],
+        "p50_ms": results["latency_stats_ms"]["p50"],
+        "p99_ms": results["latency_stats_ms"]["p99"],
+        "errors_by_class": results["errors_by_class"],
+    }
+
+
+def feasible(result, args):
+    return result["p99_ms"] <= args.p99_ms and result["success_rate_percent"] >= args.min_success_rate
+
+
+def best_result(results, args):
+    """Highest goodput among feasible results; goodput within 1% counts as a tie, won by lower p99"""
+    candidates = [result for result in results if feasible(result, args)]
+    if not candidates:
+        return None
+    top = max(result["goodput_rps"] for result in candidates)
+    return min((result for result in candidates if result["goodput_rps"] >= top * 0.99),
+               key=lambda result: result["p99_ms"])
+
+
+def format_value(value):
+    return json.dumps(value) if isinstance(value, str) else str(value)
+
+
+def write_profile(profiles_file, name, profile, comment):
+    """
+    Add or replace profile name in the profiles section of profiles_file
+
+    The file is edited as text so the comments on the other profiles are
+    kept; the result is parsed back to check it is valid.
+    """
+    with open(profiles_file, "r") as f:
+        lines = f.read().splitlines()
+
+    start = lines.index("profiles:") + 1
+    end = start
+    while end < len(lines) and (not lines[end] or lines[end].startswith((" ", "#"))):
+        end += 1
+    # Leave the blank line and comment that introduce the next top-level key
+    while end > start and (not lines[end - 1].strip() or lines[end - 1].startswith("#")):
+        end -= 1
+
+    # Drop an earlier profile with the same name, with its comment line
+    for i in range(start, end):
+        if lines[i] == f"  {name}:":
+            stop = i + 1
+            while stop < end and (not lines[stop].strip() or lines[stop].startswith("    ")):
+                stop += 1
+            first = i - 1 if i > start and lines[i - 1].startswith("  #") else i
+            del lines[first:stop]
+            end -= stop - first
+            break
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+
+    block = ["", f"  # {comment}", f"  {name}:"]
+    for key, value in profile.items():
+        line = f"    {key}: {format_value(value)}"
+        if key == "batch_timeout":
+            line += f"  # {value * 1000:g}ms"
+        block.append(line)
+    lines[end:end] = block
+
+    text = "\n".join(lines) + "\n"
+    if yaml.safe_load(text)["profiles"][name] != profile:
+        raise RuntimeError(f"Could not write profile '{name}' to {profiles_file}")
+    with open(profiles_file, "w") as f:
+        f.write(text)
+
+
+def parse_env(values):
+    env = {}
+    for value in values:
+        key, _, setting = value.partition("=")
+        env[key] = setting
+    return env
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tune a performance profile against a local server")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--batch-timeouts", type=float, nargs="+", default=[0.002, 0.005, 0.01])
+    parser.add_argument("--max-concurrent-batches", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2], help="uvicorn worker counts")
+    parser.add_argument("--search", default="grid", choices=["grid", "random"],
+                        help="grid: every combination; random: --samples of them")
+    parser.add_argument("--samples", type=int, default=10, help="Points for --search random")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate", type=float, default=200.0, help="Offered load in requests/second")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per point")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of load before each measurement")
+    parser.add_argument("--schedule", default="poisson", choices=["constant", "poisson"])
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout in seconds")
+    parser.add_argument("--p99-ms", type=float, default=250.0, help="p99 latency limit")
+    parser.add_argument("--min-success-rate", type=float, default=99.0, help="Percent of requests that must succeed")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra server environment, e.g. MODEL_BACKEND=transformers (repeatable)")
+    parser.add_argument("--profiles-file", default=os.path.join(ROOT_DIR, "performance_profiles.yaml"))
+    parser.add_argument("--profile-name", default="tuned")
+    parser.add_argument("--base-profile", default="production",
+                        help="Profile the replica, resource and HPA settings are copied from")
+    parser.add_argument("--results", default="tuning_results.json", help="Measurements of every point")
+    parser.add_argument("--dry-run", action="store_true", help="Report the winner without writing the profile")
+    args = parser.parse_args(argv)
+    args.env = parse_env(args.env)
+    return args
+
+
+def main():
+    args = parse_args()
+    with open(args.profiles_file, "r") as f:
+        base = yaml.safe_load(f)["profiles"][args.base_profile]
+
+    points = search_points(args)
+    print("Performance Profile Tuning")
+    print("=" * 50)
+    print(f"{len(points)} configurations, {args.schedule} load at {args.rate} req/s for {args.duration}s each, "
+          f"p99 <= {args.p99_ms} ms")
+    print("-" * 50)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "load.json")
+        for i, point in enumerate(points, 1):
+            try:
+                result = benchmark_point(point, args, output)
+            except (RuntimeError, subprocess.CalledProcessError) as e:
+                print(f"[{i}/{len(points)}] {point}: failed ({e})")
+                continue
+            results.append(result)
+            print(f"[{i}/{len(points)}] batch_size={point['batch_size']} batch_timeout={point['batch_timeout']} "
+                  f"max_concurrent_batches={point['max_concurrent_batches']} "
+                  f"workers={point['uvicorn_workers']}: {result['goodput_rps']:.1f} req/s   "
+                  f"p99 {result['p99_ms']:.1f} ms   success {result['success_rate_percent']:.1f}%   "
+                  f"{'ok' if feasible(result, args) else '-'}")
+
+    best = best_result(results, args)
+    with open(args.results, "w") as f:
+        json.dump({"config": vars(args), "results": results, "best": best}, f, indent=2)
+    print(f"\nMeasurements saved to {args.results}")
+
+    if best is None:
+        print(f"No configuration met p99 <= {args.p99_ms} ms with {args.min_success_rate}% success; "
+              f"lower --rate or relax --p99-ms")
+        sys.exit(1)
+
+    print(f"Best: {', '.join(f'{key}={best[key]}' for key in TUNED_KEYS)}: "
+          f"{best['goodput_rps']:.1f} req/s at p99 {best['p99_ms']:.1f} ms")
+    if args.dry_run:
+        return
+
+    profile = {**base, **{key: best[key] for key in TUNED_KEYS}}
+    comment = (f"Tuned profile - {best['goodput_rps']:.0f} req/s at p99 {best['p99_ms']:.0f} ms under "
+               f"{args.schedule} load of {args.rate:g} req/s ({datetime.date.today().isoformat()})")
+    write_profile(args.profiles_file, args.profile_name, profile, comment)
+    print(f"✓ Wrote profile '{args.profile_name}' to {args.profiles_file}")
+    print(f"Apply it with: python apply_performance_profile.py {args.profile_name}")
+
+
+if __name__ == "__main__":
+    main()